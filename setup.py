@@ -36,7 +36,7 @@ setuptools.setup(
     },
     entry_points={
         "tensorboard_plugins": [
-            "geometry = tensorboard_plugin_geometry.plugin:GeoPlugin",
+            "geometry = tensorboard_plugin_geometry.plugin_loader:GeoPluginLoader",
         ],
     },
     keywords='tensorboard mesh geometries plugin'
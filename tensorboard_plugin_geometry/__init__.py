@@ -1,3 +1,22 @@
 __version__ = '0.6.0'
 
-from .summary import add_geometry
\ No newline at end of file
+# The writing API is imported on first use, so that TensorBoard loading the
+# plugin through `plugin_loader` does not import it.
+_EXPORTS = {
+  'add_geometry': 'summary',
+  'add_geometries': 'summary',
+  'use_sidecar_storage': 'summary',
+  'GeometryLogger': 'geometry_logger',
+}
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+  if name not in _EXPORTS:
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+  import importlib
+  value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+  globals()[name] = value
+  return value
+
+def __dir__():
+  return sorted(list(globals()) + list(_EXPORTS))
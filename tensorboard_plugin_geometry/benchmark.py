@@ -0,0 +1,20 @@
+import os
+
+os.sys.path.append('..')
+
+from tests.bench_writer import benchmarks as WriterBenchmarks
+from tests.bench_data_server import benchmarks as DataServerBenchmarks
+from tests.bench_tag_server import benchmarks as TagServerBenchmarks
+from tests.bench_import import benchmarks as ImportBenchmarks
+from tests.bench_startup import benchmarks as StartupBenchmarks
+from tests.bench_load import benchmarks as LoadBenchmarks
+
+print(' ')
+print('start benchmarks')
+b1 = WriterBenchmarks()
+b2 = DataServerBenchmarks()
+b3 = TagServerBenchmarks()
+b4 = ImportBenchmarks()
+b5 = StartupBenchmarks()
+b6 = LoadBenchmarks()
+print('')
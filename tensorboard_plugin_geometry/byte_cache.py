@@ -0,0 +1,118 @@
+import collections
+import threading
+
+class ByteCache():
+  """A size bounded LRU cache of serialized geometry buffers.
+
+  Keys are tuples of the run name and the ETag of the buffer, which changes
+  with the data it is created from. Entries of replaced data are never hit
+  again and are evicted like any other least recently used entry.
+
+  Concurrent requests of a missing key are coalesced: only the first one
+  creates the buffer, the others wait for it.
+  """
+
+  def __init__(self, max_size):
+    """
+    Args:
+      max_size: maximum number of bytes to keep. 0 disables the cache.
+    """
+    self.max_size = max_size
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+    self.coalesced = 0
+    self._entries = collections.OrderedDict()
+    # key -> _Flight of buffers being created
+    self._flights = {}
+    self._lock = threading.Lock()
+
+  def get(self, key, create):
+    """Gets the buffer for key or creates and caches it.
+    Args:
+      key: tuple of run name and further identifiers of the buffer.
+      create: callable returning the buffer if it is not cached.
+    Returns:
+      The cached or created bytes.
+    """
+    with self._lock:
+      value = self._entries.get(key)
+      if value is not None:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+      flight = self._flights.get(key)
+      creating = flight is None
+      if creating:
+        self.misses += 1
+        flight = self._flights[key] = _Flight()
+      else:
+        self.coalesced += 1
+
+    if not creating:
+      return flight.wait()
+
+    try:
+      value = create()
+    except BaseException as err:
+      self._land(key, flight, error=err)
+      raise
+    self.put(key, value)
+    self._land(key, flight, value)
+    return value
+
+  def contains(self, key):
+    """Returns whether a buffer is cached for key."""
+    with self._lock:
+      return key in self._entries
+
+  def stats(self):
+    """Returns the size and hit/miss counters of the cache."""
+    with self._lock:
+      return {
+        "size": self.size,
+        "max_size": self.max_size,
+        "entries": len(self._entries),
+        "hits": self.hits,
+        "misses": self.misses,
+        "coalesced": self.coalesced,
+      }
+
+  def _land(self, key, flight, value=None, error=None):
+    """Hands the created buffer or error to the waiting requests."""
+    with self._lock:
+      del self._flights[key]
+    flight.value = value
+    flight.error = error
+    flight.done.set()
+
+  def put(self, key, value):
+    """Adds value and evicts least recently used entries beyond max_size."""
+    if len(value) > self.max_size:
+      return
+
+    with self._lock:
+      if key in self._entries:
+        return
+      self._entries[key] = value
+      self.size += len(value)
+
+      while self.size > self.max_size:
+        _, evicted = self._entries.popitem(last=False)
+        self.size -= len(evicted)
+
+class _Flight():
+  """A buffer that is being created by one request for others."""
+
+  def __init__(self):
+    self.value = None
+    self.error = None
+    self.done = threading.Event()
+
+  def wait(self):
+    """Waits for the buffer and returns it or raises the error creating it."""
+    self.done.wait()
+    if self.error is not None:
+      raise self.error
+    return self.value
@@ -0,0 +1,75 @@
+import os
+import threading
+
+class ChangeLog():
+  """Records when entries of a response last changed, so that clients can
+  request only the changes since a token of an earlier response.
+
+  Entries are grouped in scopes, e.g. the steps of a (run, tag). Tokens are
+  only comparable within the process that issued them.
+  """
+
+  def __init__(self):
+    self._epoch = os.urandom(4).hex()
+    self._generation = 0
+    # scope -> key -> (value, generation of its last change)
+    self._entries = {}
+    # scope -> key -> generation of its removal
+    self._removed = {}
+    self._lock = threading.Lock()
+
+  def update(self, scope, entries):
+    """Replaces the entries of a scope and records which of them changed.
+    Args:
+      scope: hashable name of the group of entries.
+      entries: dict of all current entries of the scope.
+    """
+    with self._lock:
+      old = self._entries.get(scope, {})
+      removed = self._removed.setdefault(scope, {})
+      changed = [key for key, value in entries.items() if key not in old or old[key][0] != value]
+      gone = [key for key in old if key not in entries]
+      if not changed and not gone:
+        return
+
+      self._generation += 1
+      new = dict(old)
+      for key in changed:
+        new[key] = (entries[key], self._generation)
+        removed.pop(key, None)
+      for key in gone:
+        del new[key]
+        removed[key] = self._generation
+      self._entries[scope] = new
+
+  def changes(self, scope, token):
+    """Gets the entries of a scope that changed after a token was issued.
+    Args:
+      scope: name of the group of entries.
+      token: token of an earlier response. Empty or unknown tokens, e.g.
+        from before a restart, get all entries.
+    Returns:
+      Tuple of the current token, whether all entries are returned, a dict
+      of the changed entries and a list of the removed keys.
+    """
+    with self._lock:
+      since = self._parse(token)
+      current = '%s.%d' % (self._epoch, self._generation)
+      entries = self._entries.get(scope, {})
+      if since is None:
+        return current, True, {key: value for key, (value, _) in entries.items()}, []
+
+      changed = {
+        key: value for key, (value, generation) in entries.items() if generation > since
+      }
+      removed = [
+        key for key, generation in self._removed.get(scope, {}).items() if generation > since
+      ]
+      return current, False, changed, removed
+
+  def _parse(self, token):
+    """Gets the generation of a token issued by this log or None."""
+    epoch, _, generation = (token or '').partition('.')
+    if epoch != self._epoch or not generation.isdigit() or int(generation) > self._generation:
+      return None
+    return int(generation)
@@ -1,13 +1,66 @@
+import collections
+import hashlib
+import json
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import six
+from tensorboard.compat.proto import types_pb2
 from tensorboard.util import tensor_util
 
+from . import lod
+from . import quantization
+from . import stats
 from .plugin_data_pb2 import GeoPluginData
 
+# Dtypes in which each component is sent to the client.
+_TENSOR_TYPES = {
+  GeoPluginData.VERTICES: (np.float32, types_pb2.DT_FLOAT),
+  GeoPluginData.FACES: (np.int32, types_pb2.DT_INT32),
+  GeoPluginData.FEATURES: (np.float32, types_pb2.DT_FLOAT),
+  GeoPluginData.VERT_COLORS: (np.uint8, types_pb2.DT_UINT8),
+  GeoPluginData.FACE_COLORS: (np.uint8, types_pb2.DT_UINT8),
+  GeoPluginData.FEAT_COLORS: (np.uint8, types_pb2.DT_UINT8),
+}
+
+# Components in step payloads start at multiples of this number of bytes,
+# so that the client can create typed arrays without copying.
+_ALIGNMENT = 8
+
+# Maximum size in bytes of the chunks of streamed responses.
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Components of at least this many bytes are decoded on the worker pool.
+# Smaller ones are decoded faster than the workers are scheduled.
+_MIN_PARALLEL_SIZE = 4 << 20
+
+# Maximum number of tensors whose statistics are kept.
+_MAX_STATS = 4096
+
 class DataServer():
 
-  def __init__(self, multiplexer, tag_server):
+  def __init__(self, multiplexer, tag_server, cache, decode_threads=1):
+    """
+    Args:
+      multiplexer: EventMultiplexer of TensorBoard.
+      tag_server: TagServer of the plugin.
+      cache: ByteCache of the serialized buffers.
+      decode_threads: number of threads decoding large components, 1 decodes
+        on the request thread.
+    """
     self._multiplexer = multiplexer
     self._tag_server = tag_server
+    self._cache = cache
+    self._decode_threads = decode_threads
+    self._pool = None
+    if decode_threads > 1:
+      self._pool = ThreadPoolExecutor(decode_threads, thread_name_prefix='GeometryDecode')
+    # (run, tag, content_type, step) -> (wall_time, statistics of the
+    # samples of the tensor), least recently used first
+    self._stats = collections.OrderedDict()
+    self._stats_lock = threading.Lock()
 
   def get_data_response(self, request, plugin_name):
     """A route that returns data for particular summary of specified type.
@@ -17,42 +70,353 @@ class DataServer():
     separate roundtrip to the server.
     Args:
       request: werkzeug.Request containing content_type as a name of enum
-        GeoPluginData.ContentType.
+        GeoPluginData.ContentType and optionally a sample index or range
+        `start:stop` of the samples to return, the maximum number of
+        vertices per sample `max_points` and the `precision` of vertices and
+        features (see `quantization.PRECISIONS`). Quantized data must be
+        decoded with the bounds of `get_data_bounds`.
       plugin_name: identifier of the plugin
     Returns:
       data response
     """
     step = float(request.args.get("step", 0.0))
-    content_type = request.args.get("content_type")
-    content_type = GeoPluginData.ContentType.Value(content_type)
-    
+    content_type_name = request.args.get("content_type")
+    content_type = GeoPluginData.ContentType.Value(content_type_name)
+    samples = _parse_samples(request)
+    precision = _parse_precision(request)
+
+    def create():
+      if _parse_max_points(request) is not None:
+        data, _ = self._create_lod_components(request).get(content_type, (b'', None))
+      else:
+        tensor_events = self._collect_tensor_events(request, step)
+
+        # Samples are concatenated as raw bytes, the client knows their shapes
+        # from the metadata.
+        tensors = [tensor for meta, tensor in tensor_events if meta.content_type == content_type]
+        data, _ = self._get_component(tensors, content_type, samples)
+        self._update_stats(request, content_type, tensors)
+
+      if precision != 'float32' and content_type in quantization.COMPONENTS:
+        data, _ = self._encode(request, content_type, data)
+      return data
+
+    return self._cached(request, content_type_name, create)
+
+  def get_data_stream(self, request, min_size):
+    """Returns the data of `get_data_response` as an iterator over chunks of
+    at most STREAM_CHUNK_SIZE bytes. Chunks are copied from the loaded
+    tensors one at a time, so the data is never held in memory twice.
+    Args:
+      request: werkzeug.Request, see `get_data_response`.
+      min_size: minimum size in bytes of the data to be streamed.
+    Returns:
+      Iterator over the chunks or None if the data is smaller than min_size,
+      already cached or must be decimated or encoded first.
+    """
+    content_type_name = request.args.get("content_type")
+    content_type = GeoPluginData.ContentType.Value(content_type_name)
+    if _parse_max_points(request) is not None or (
+      _parse_precision(request) != 'float32' and content_type in quantization.COMPONENTS
+    ):
+      return None
+
+    run = request.args.get("run")
+    etag, _ = self.get_data_version(request, content_type_name)
+    if self._cache.contains((run, etag)):
+      return None
+
+    step = float(request.args.get("step", 0.0))
+    tensors = [tensor for meta, tensor in self._collect_tensor_events(request, step) if meta.content_type == content_type]
+    selected = self._select_samples(tensors, _parse_samples(request))
+
+    if _size(selected, content_type) < min_size:
+      return None
+
+    self._update_stats(request, content_type, tensors)
+
+    return self._iter_chunks(selected, content_type)
+
+  def get_step_response(self, request):
+    """Returns all components of a geometry at one step as a single payload.
+    The payload starts with the byte length of a JSON header as little endian
+    uint32, followed by the header and the data of all components. The header
+    lists for each component its name, dtype, shape and the offset and length
+    in bytes of its data relative to the end of the header. Header and
+    components are padded so that each component starts at an offset aligned
+    to 8 bytes.
+    Args:
+      request: werkzeug.Request containing run, tag, step and optionally
+        a sample index or range `start:stop` of the samples to return, the
+        maximum number of vertices per sample `max_points` and the
+        `precision` of vertices and features. For `uint16` the header
+        contains the bounds to decode them.
+    Returns:
+      data response
+    """
+    return self._cached(request, None, lambda: self._create_step_response(request))
+
+  def get_step_stream(self, request, min_size):
+    """Returns the payload of `get_step_response` as an iterator over the
+    framed header and chunks of at most STREAM_CHUNK_SIZE bytes of the
+    components, which are copied from the loaded tensors one at a time.
+    Args:
+      request: werkzeug.Request, see `get_step_response`.
+      min_size: minimum size in bytes of the components to be streamed.
+    Returns:
+      Iterator over the chunks or None if the components are smaller than
+      min_size, already cached, encoded or decimated.
+    """
+    if _parse_precision(request) != 'float32':
+      return None
+
+    run = request.args.get("run")
+    etag, _ = self.get_data_version(request)
+    if self._cache.contains((run, etag)):
+      return None
+
+    step = float(request.args.get("step", 0.0))
+    samples = _parse_samples(request)
     tensor_events = self._collect_tensor_events(request, step)
+    components = []
+    for content_type in sorted(_TENSOR_TYPES):
+      tensors = [tensor for meta, tensor in tensor_events if meta.content_type == content_type]
+      if tensors:
+        components.append((content_type, self._select_samples(tensors, samples)))
 
-    response = [
-      self._get_tensor_data(tensor)
-      for meta, tensor in tensor_events
-      if meta.content_type == content_type
+    # Steps that are decimated depend on all of their vertices.
+    max_points = _parse_max_points(request)
+    for content_type, selected in components:
+      shape = _selected_shape(selected)
+      if (
+        content_type == GeoPluginData.VERTICES and max_points is not None and
+        len(shape) == 3 and shape[1] > max_points
+      ):
+        return None
+
+    if sum(_size(selected, content_type) for content_type, selected in components) < min_size:
+      return None
+
+    for content_type, selected in components:
+      self._update_stats(request, content_type, [tensor for tensor, _, _ in selected])
+
+    return self._iter_step_chunks(components)
+
+  def get_data_bounds(self, request):
+    """Gets the bounds that quantized data of `get_data_response` is encoded
+    with. Only the step of the request is decoded, if its statistics are not
+    cached.
+    Returns:
+      Bounds of the requested component, see `quantization.get_bounds`, or
+      None if the data is not quantized.
+    """
+    content_type = GeoPluginData.ContentType.Value(request.args.get("content_type"))
+    if _parse_precision(request) != 'uint16' or content_type not in quantization.COMPONENTS:
+      return None
+    return self._step_bounds(request, content_type)
+
+  def get_bounds(self, run, tag, content_type, event):
+    """Gets the bounding box of the tensor of a TensorEvent of VERTICES or
+    FEATURES, see `quantization.get_bounds`."""
+    bounds = [
+      [sample["min"], sample["max"]]
+      for sample in self.get_stats(run, tag, content_type, event)
+      if None not in sample["min"] + sample["max"]
     ]
+    if not bounds:
+      return quantization.get_bounds(np.zeros((0, 3)))
+    return quantization.union_bounds(bounds)
 
-    np_type = {
-      GeoPluginData.VERTICES: np.float32,
-      GeoPluginData.FACES: np.int32,
-      GeoPluginData.FEATURES: np.float32,
-      GeoPluginData.VERT_COLORS: np.uint8,
-      GeoPluginData.FACE_COLORS: np.uint8,
-      GeoPluginData.FEAT_COLORS: np.uint8,
-    }
+  def get_stats(self, run, tag, content_type, event):
+    """Gets the statistics of the samples of the tensor of a TensorEvent of
+    VERTICES or FEATURES, see `stats.get_sample_stats`. They are computed
+    when the tensor is first decoded or their step first listed.
+    Returns:
+      List of the statistics of each sample.
+    """
+    key = (run, tag, content_type, event.step)
+    with self._stats_lock:
+      wall_time, sample_stats = self._stats.get(key, (None, None))
+      if wall_time == event.wall_time:
+        self._stats.move_to_end(key)
+        return sample_stats
 
-    response = np.array(response, dtype=np_type[content_type])
-    print('got array for %s - %s - %s - %d of shape %s' % (request.args.get("run"), request.args.get("tag"), request.args.get("step"), content_type, response.shape))
-    # Looks like reshape can take around 160ms, so why not store it reshaped.
-    return response.reshape(-1).tobytes()
+    np_type, _ = _TENSOR_TYPES[content_type]
+    array = self._get_tensor_array(event, content_type).astype(np_type, copy=False)
+    sample_stats = stats.get_sample_stats(array, content_type)
+    with self._stats_lock:
+      # a newer event of the step replaces the statistics of the old one
+      self._stats[key] = (event.wall_time, sample_stats)
+      self._stats.move_to_end(key)
+      while len(self._stats) > _MAX_STATS:
+        self._stats.popitem(last=False)
+    return sample_stats
 
+  def get_cache_stats(self):
+    """Returns size and hit/miss counters of the buffer cache."""
+    return self._cache.stats()
+
+  def get_data_version(self, request, content_type=None):
+    """Identifies the version of requested data without decoding tensors.
+    Args:
+      request: werkzeug.Request containing run, tag and step.
+      content_type: name of enum GeoPluginData.ContentType of the requested
+        data or None if all components are requested.
+    Returns:
+      Tuple of a strong ETag and whether the step is finished, i.e. newer
+      steps have been written since. A step which is not finished may still
+      be replaced by the multiplexer.
+    """
+    run = request.args.get("run")
+    tag = request.args.get("tag")
+    step = float(request.args.get("step", 0.0))
+    if content_type is not None:
+      content_type = GeoPluginData.ContentType.Value(content_type)
+
+    max_points = _parse_max_points(request)
+
+    # Decimated components depend on all components of the step.
+    wall_times = [
+      tensor.wall_time
+      for meta, tensor in self._collect_tensor_events(request, step)
+      if content_type is None or max_points is not None or meta.content_type == content_type
+    ]
+    version = repr((
+      run, tag, step, content_type, _parse_samples(request), max_points,
+      _parse_precision(request), max(wall_times, default=None)
+    ))
+    etag = hashlib.sha1(version.encode('utf8')).hexdigest()
+
+    finished = all(
+      latest_step is not None and latest_step > step
+      for latest_step in (
+        self._tag_server.tensor_index.latest_step(run, instance_tag)
+        for instance_tag in self._tag_server._instance_tags(run, tag)
+      )
+    )
+
+    return etag, finished and bool(wall_times)
 
 
 
 
 ######### private methods ########
+  def _cached(self, request, content_type, create):
+    """Gets a response buffer from the cache or creates and caches it."""
+    run = request.args.get("run")
+    etag, _ = self.get_data_version(request, content_type)
+    return self._cache.get((run, etag), create)
+
+  def _create_step_response(self, request):
+    """Frames all components of a step, see `get_step_response`."""
+    if _parse_max_points(request) is not None:
+      components = self._create_lod_components(request)
+      return _frame_components(self._encode_components(request, [
+        (content_type, data, shape)
+        for content_type, (data, shape) in sorted(components.items())
+      ]))
+
+    step = float(request.args.get("step", 0.0))
+    samples = _parse_samples(request)
+    tensor_events = self._collect_tensor_events(request, step)
+
+    components = []
+    for content_type in sorted(_TENSOR_TYPES):
+      tensors = [tensor for meta, tensor in tensor_events if meta.content_type == content_type]
+      if tensors:
+        data, shape = self._get_component(tensors, content_type, samples)
+        components.append((content_type, data, shape))
+        self._update_stats(request, content_type, tensors)
+
+    return _frame_components(self._encode_components(request, components))
+
+  def _update_stats(self, request, content_type, tensors):
+    """Computes the missing statistics of the tensors of a component while
+    they are decoded, so that `/geometries` can list them without reading
+    all steps."""
+    if content_type in stats.COMPONENTS:
+      for tensor in tensors:
+        self.get_stats(request.args.get("run"), request.args.get("tag"), content_type, tensor)
+
+  def _encode_components(self, request, components):
+    """Encodes vertices and features with the requested precision.
+    Args:
+      request: werkzeug.Request containing run, tag, step and precision.
+      components: list of tuples of GeoPluginData.ContentType, raw bytes and
+        shape of the component.
+    Returns:
+      list of tuples of GeoPluginData.ContentType, encoded bytes, shape,
+      dtype name and bounds needed for decoding or None.
+    """
+    encoded = []
+    for content_type, data, shape in components:
+      dtype = np.dtype(_TENSOR_TYPES[content_type][0]).name
+      bounds = None
+      if _parse_precision(request) != 'float32' and content_type in quantization.COMPONENTS:
+        data, bounds = self._encode(request, content_type, data)
+        dtype = _parse_precision(request)
+      encoded.append((content_type, data, shape, dtype, bounds))
+    return encoded
+
+  def _encode(self, request, content_type, data):
+    """Encodes float32 bytes of a component with the requested precision.
+    Returns:
+      Tuple of the encoded bytes and the bounds used for uint16 or None.
+    """
+    precision = _parse_precision(request)
+    bounds = None
+    if precision == 'uint16':
+      bounds = self._step_bounds(request, content_type)
+
+    array = np.frombuffer(data, dtype=np.float32).reshape(-1, 3)
+    return quantization.encode(array, precision, bounds).tobytes(), bounds
+
+  def _step_bounds(self, request, content_type):
+    """Bounding box of all tensors of a component at the requested step."""
+    run = request.args.get("run")
+    tag = request.args.get("tag")
+    step = float(request.args.get("step", 0.0))
+
+    bounds = [
+      self.get_bounds(run, tag, content_type, tensor)
+      for meta, tensor in self._collect_tensor_events(request, step)
+      if meta.content_type == content_type
+    ]
+    return quantization.union_bounds(bounds) if bounds else None
+
+  def _create_lod_components(self, request):
+    """Decimates all components of a step to at most `max_points` vertices
+    per sample. As all components are decimated at once, each of them is
+    added to the cache for later `/data` requests.
+    Returns:
+      dict of GeoPluginData.ContentType to tuples of raw bytes and shape,
+      vertices and features as float32.
+    """
+    run = request.args.get("run")
+    step = float(request.args.get("step", 0.0))
+    samples = _parse_samples(request)
+    tensor_events = self._collect_tensor_events(request, step)
+
+    arrays = dict()
+    for content_type, (np_type, _) in six.iteritems(_TENSOR_TYPES):
+      tensors = [tensor for meta, tensor in tensor_events if meta.content_type == content_type]
+      if tensors:
+        data, shape = self._get_component(tensors, content_type, samples)
+        arrays[content_type] = np.frombuffer(data, dtype=np_type).reshape(shape)
+        self._update_stats(request, content_type, tensors)
+
+    components = dict()
+    for content_type, array in six.iteritems(lod.decimate(arrays, _parse_max_points(request))):
+      data = array.tobytes()
+      components[content_type] = (data, list(array.shape))
+
+      if _parse_precision(request) != 'float32' and content_type in quantization.COMPONENTS:
+        data, _ = self._encode(request, content_type, data)
+      etag, _ = self.get_data_version(request, GeoPluginData.ContentType.Name(content_type))
+      self._cache.put((run, etag), data)
+
+    return components
+
   def _collect_tensor_events(self, request, step):
     """Collects list of tensor events based on request."""
     run = request.args.get("run")
@@ -60,15 +424,11 @@ class DataServer():
 
     tensor_events = []  # List of tuples (meta, tensor) that contain tag.
     for instance_tag in self._tag_server._instance_tags(run, tag):
-      tensors = self._multiplexer.Tensors(run, instance_tag)
+      tensors = self._tag_server.tensor_index.tensors(run, instance_tag, step)
       meta, _ = self._tag_server._instance_tag_metadata(run, instance_tag)
       tensor_events += [(meta, tensor) for tensor in tensors]
 
-    if step is not None:
-      tensor_events = [
-        event for event in tensor_events if event[1].step == step
-      ]
-    else:
+    if step is None:
       # Make sure tensors sorted by step in ascending order.
       tensor_events = sorted(
         tensor_events, key=lambda tensor_data: tensor_data[1].step
@@ -76,7 +436,252 @@ class DataServer():
 
     return tensor_events
 
-  def _get_tensor_data(self, event):
-    """Convert a TensorEvent into a JSON-compatible response."""
-    data = tensor_util.make_ndarray(event.tensor_proto)
-    return data.tolist()  
+  def _get_component(self, tensors, content_type, samples=None):
+    """Concatenates the samples of all tensors of one component.
+    Args:
+      tensors: list of TensorEvents of the component.
+      content_type: GeoPluginData.ContentType of the component.
+      samples: optional range (start, stop) of samples of the concatenated
+        batches to return.
+    Returns:
+      Tuple of the raw bytes and the shape of the concatenated samples.
+    """
+    selected = self._select_samples(tensors, samples)
+    size = _size(selected, content_type)
+    whole = len(selected) == 1 and selected[0][1:] == (0, _shape(selected[0][0])[0])
+
+    if whole and _is_packed(selected[0][0], content_type) and isinstance(
+      selected[0][0].tensor_proto.tensor_content, bytes
+    ):
+      data = selected[0][0].tensor_proto.tensor_content
+    elif self._pool is not None and size >= _MIN_PARALLEL_SIZE:
+      data = self._decode_parallel(selected, content_type, size)
+    elif whole:
+      # tensors of sidecar files are views of the mapped file
+      data = bytes(self._get_tensor_bytes(selected[0][0], content_type))
+    else:
+      data = b''.join(
+        self._get_tensor_bytes(tensor, content_type, start, stop)
+        for tensor, start, stop in selected
+      )
+
+    return data, _selected_shape(selected)
+
+  def _select_samples(self, tensors, samples=None):
+    """Selects the samples of the concatenated batches of tensors.
+    Returns:
+      List of (tensor, start, stop) for all tensors with selected samples.
+    """
+    selected = []
+    offset = 0
+    for tensor in tensors:
+      shape = _shape(tensor)
+      start, stop = 0, shape[0]
+      if samples is not None:
+        start = min(max(samples[0] - offset, 0), shape[0])
+        stop = min(max(samples[1] - offset, 0), shape[0])
+      offset += shape[0]
+
+      if start < stop:
+        selected.append((tensor, start, stop))
+    return selected
+
+  def _decode_parallel(self, selected, content_type, size):
+    """Decodes the selected samples into one buffer on the worker pool.
+    The samples are split into about two slices per thread, which are
+    converted and copied by NumPy, as it releases the GIL meanwhile.
+    Returns:
+      bytearray of the concatenated samples in the dtype of content_type.
+    """
+    np_type, _ = _TENSOR_TYPES[content_type]
+    arrays = list(self._pool.map(
+      lambda item: self._get_tensor_array(item[0], content_type)[item[1]:item[2]].reshape(-1),
+      selected
+    ))
+
+    data = bytearray(size)
+    out = np.frombuffer(data, dtype=np_type)
+    slice_size = -(-out.size // (2 * self._decode_threads))
+    slices = []
+    offset = 0
+    for array in arrays:
+      for start in range(0, array.size, slice_size):
+        stop = min(start + slice_size, array.size)
+        slices.append((array, start, stop, offset + start))
+      offset += array.size
+
+    def copy(item):
+      array, start, stop, offset = item
+      out[offset:offset + stop - start] = array[start:stop]
+    list(self._pool.map(copy, slices))
+    return data
+
+  def _iter_step_chunks(self, components):
+    """Yields the framed header and the chunks of the selected samples of
+    each component, see `get_step_response`.
+    Args:
+      components: list of tuples of GeoPluginData.ContentType and the
+        selected samples of the component.
+    """
+    header = []
+    offset = 0
+    for content_type, selected in components:
+      np_type, _ = _TENSOR_TYPES[content_type]
+      length = _size(selected, content_type)
+      header.append(_header_entry(content_type, np.dtype(np_type).name, _selected_shape(selected), offset, length))
+      offset += length + len(_padding(length))
+    yield _frame_header(header)
+
+    for content_type, selected in components:
+      for chunk in self._iter_chunks(selected, content_type):
+        yield chunk
+      padding = _padding(_size(selected, content_type))
+      if padding:
+        yield padding
+
+  def _iter_chunks(self, selected, content_type):
+    """Yields the bytes of the selected samples in chunks of at most
+    STREAM_CHUNK_SIZE bytes."""
+    for tensor, start, stop in selected:
+      data = memoryview(self._get_tensor_bytes(tensor, content_type, start, stop))
+      for offset in range(0, len(data), STREAM_CHUNK_SIZE):
+        # WSGI servers only accept bytes, so only one chunk is copied at a time
+        yield data[offset:offset + STREAM_CHUNK_SIZE].tobytes()
+
+  def _get_tensor_bytes(self, event, content_type, start=None, stop=None):
+    """Returns the raw bytes of a TensorEvent in the dtype of content_type.
+    If start and stop are given, only these samples of the batch are returned.
+    """
+    np_type, _ = _TENSOR_TYPES[content_type]
+    tensor_proto = event.tensor_proto
+
+    # Packed tensors of the expected dtype can be served as they are.
+    if _is_packed(event, content_type):
+      if start is None:
+        return tensor_proto.tensor_content
+
+      shape = _shape(event)
+      sample_size = int(np.prod(shape[1:])) * np.dtype(np_type).itemsize
+      return memoryview(tensor_proto.tensor_content)[start * sample_size:stop * sample_size]
+
+    # Older summaries store values as lists or with another dtype.
+    data = tensor_util.make_ndarray(tensor_proto)[start:stop]
+    return data.astype(np_type, copy=False).tobytes()
+
+  def _get_tensor_array(self, event, content_type):
+    """Returns a TensorEvent as array, a view of packed tensors of the dtype
+    of content_type and in the stored dtype otherwise."""
+    if _is_packed(event, content_type):
+      np_type, _ = _TENSOR_TYPES[content_type]
+      return np.frombuffer(event.tensor_proto.tensor_content, dtype=np_type).reshape(_shape(event))
+    return tensor_util.make_ndarray(event.tensor_proto)
+
+
+def _padding(length):
+  """Returns the zero bytes needed to align length to _ALIGNMENT."""
+  return b'\0' * (-length % _ALIGNMENT)
+
+def _frame_components(components):
+  """Frames components into one payload, see `get_step_response`.
+  Args:
+    components: list of tuples of GeoPluginData.ContentType, raw bytes,
+      shape, dtype name and bounds (or None) of the component.
+  """
+  header = []
+  chunks = []
+  offset = 0
+  for content_type, data, shape, dtype, bounds in components:
+    header.append(_header_entry(content_type, dtype, shape, offset, len(data)))
+    if bounds is not None:
+      header[-1]["bounds"] = bounds
+    chunks += [data, _padding(len(data))]
+    offset += len(data) + len(chunks[-1])
+
+  return b''.join([_frame_header(header)] + chunks)
+
+def _header_entry(content_type, dtype, shape, offset, length):
+  """Describes a component in the header of a step payload."""
+  return {
+    "name": GeoPluginData.ContentType.Name(content_type).lower(),
+    "dtype": dtype,
+    "shape": shape,
+    "offset": offset,
+    "length": length,
+  }
+
+def _frame_header(header):
+  """Returns the length and the padded JSON of the header of a step payload."""
+  header = json.dumps({"components": header}).encode('utf8')
+  header += b' ' * len(_padding(4 + len(header)))
+  return struct.pack('<I', len(header)) + header
+
+def _is_packed(event, content_type):
+  """Whether the tensor_content of a TensorEvent is in the dtype of
+  content_type."""
+  _, proto_type = _TENSOR_TYPES[content_type]
+  return bool(event.tensor_proto.tensor_content) and event.tensor_proto.dtype == proto_type
+
+def _size(selected, content_type):
+  """Number of bytes of the selected samples in the dtype of content_type."""
+  np_type, _ = _TENSOR_TYPES[content_type]
+  return sum(
+    (stop - start) * int(np.prod(_shape(tensor)[1:])) * np.dtype(np_type).itemsize
+    for tensor, start, stop in selected
+  )
+
+def _shape(event):
+  """Returns the shape of a TensorEvent's tensor as list."""
+  return [dim.size for dim in event.tensor_proto.tensor_shape.dim]
+
+def _selected_shape(selected):
+  """Returns the shape of the concatenated selected samples."""
+  return _concat_shape([[stop - start] + _shape(tensor)[1:] for tensor, start, stop in selected])
+
+def _concat_shape(shapes):
+  """Shape of the concatenation of tensors along the batch dimension."""
+  if not shapes:
+    return [0]
+  if all(shape[1:] == shapes[0][1:] for shape in shapes):
+    return [sum(shape[0] for shape in shapes)] + shapes[0][1:]
+  return [sum(int(np.prod(shape)) for shape in shapes)]
+
+def _parse_precision(request):
+  """Parses the optional precision of vertices and features of a request."""
+  precision = request.args.get("precision", 'float32')
+  if precision not in quantization.PRECISIONS:
+    raise ValueError("Unknown precision %s, expected one of %s." % (
+      precision, quantization.PRECISIONS))
+  return precision
+
+def _parse_max_points(request):
+  """Parses the optional maximum number of vertices per sample of a request."""
+  max_points = request.args.get("max_points")
+  if max_points is None:
+    return None
+
+  max_points = int(max_points)
+  if max_points <= 0:
+    raise ValueError("max_points must be positive, but got %d." % max_points)
+  return max_points
+
+def _parse_samples(request):
+  """Parses the optional sample index or range `start:stop` of a request.
+  Returns:
+    Tuple (start, stop) or None if all samples are requested.
+  Raises:
+    ValueError if the sample argument is malformed.
+  """
+  sample = request.args.get("sample")
+  if sample is None:
+    return None
+
+  if ':' in sample:
+    start, stop = sample.split(':')
+    start, stop = int(start or 0), int(stop) if stop else float('inf')
+  else:
+    start = int(sample)
+    stop = start + 1
+
+  if start < 0 or stop < start:
+    raise ValueError("Invalid sample range %s." % sample)
+  return start, stop
@@ -0,0 +1,209 @@
+import collections
+import threading
+import time
+
+from . import summary
+from .plugin_data_pb2 import GeoPluginData
+
+# Policies if a geometry is logged while max_pending geometries are queued.
+OVERFLOW_POLICIES = ['block', 'drop_oldest']
+
+# argument name of _geometry for each component
+_ARGUMENTS = {
+  GeoPluginData.VERTICES: 'vertices',
+  GeoPluginData.VERT_COLORS: 'vert_colors',
+  GeoPluginData.FACES: 'faces',
+  GeoPluginData.FACE_COLORS: 'face_colors',
+  GeoPluginData.FEATURES: 'features',
+  GeoPluginData.FEAT_COLORS: 'feat_colors',
+}
+
+_Pending = collections.namedtuple('_Pending', ['tag', 'tensors', 'description', 'config_dict', 'global_step', 'walltime'])
+
+class GeometryLogger():
+  """Writes geometries to a SummaryWriter in the background.
+
+  `add_geometry` only validates the shapes and copies the tensors to host
+  memory on the calling thread. Summaries are serialized by a pool of worker
+  threads and written in the order they were logged, so that TensorBoard does
+  not discard events with out-of-order steps.
+
+  Usage:
+    with GeometryLogger(writer) as logger:
+      logger.add_geometry('tag', vertices, global_step=step)
+  """
+
+  def __init__(self, writer, num_workers=1, max_pending=8, overflow='block', keyframe_interval=None):
+    """
+    Args:
+      writer: torch.utils.tensorboard.SummaryWriter or event file writer to
+        write to, see `add_geometry`.
+      num_workers: number of threads serializing geometries.
+      max_pending: maximum number of geometries waiting to be serialized.
+      overflow: `block` waits for a free slot if max_pending geometries are
+        queued, `drop_oldest` discards the oldest queued geometry instead.
+      keyframe_interval: write unchanged components as references, see
+        `add_geometry`.
+    """
+    if overflow not in OVERFLOW_POLICIES:
+      raise ValueError("Unknown overflow policy %s, expected one of %s." % (overflow, OVERFLOW_POLICIES))
+    if num_workers < 1 or max_pending < 1:
+      raise ValueError("num_workers and max_pending must be positive, but got %d and %d" % (num_workers, max_pending))
+
+    self.dropped = 0
+    self._writer = writer
+    self._max_pending = max_pending
+    self._overflow = overflow
+    self._keyframe_interval = keyframe_interval
+    self._pending = collections.deque()
+    # guards the queue and the counters only, never held while writing
+    self._condition = threading.Condition()
+    # number of dequeued geometries and of written geometries, used to wait
+    # for all of them in flush()
+    self._started = 0
+    self._written = 0
+    # turnstile of the workers writing in order: index of the next geometry
+    # to be written
+    self._turn = threading.Condition()
+    self._next_write = 0
+    self._error = None
+    self._closed = False
+
+    self._workers = [
+      threading.Thread(target=self._work, name='GeometryLogger-%d' % i, daemon=True)
+      for i in range(num_workers)
+    ]
+    for worker in self._workers:
+      worker.start()
+
+  def add_geometry(
+    self,
+    tag,
+    vertices,
+    vert_colors=None,
+    faces=None,
+    face_colors=None,
+    features=None,
+    feat_colors=None,
+    config_dict=None,
+    global_step=None,
+    walltime=None,
+    description=None):
+    """Queues meshes or 3D point clouds to be written. The arguments are the
+    same as for `add_geometry`. Tensors are copied, so they can be modified
+    once this returns."""
+    if self._closed:
+      raise RuntimeError("GeometryLogger is closed.")
+
+    tensors = summary._to_arrays(
+      vertices, vert_colors, faces, face_colors, features, feat_colors, copy=True
+    )
+    summary._check_geometry(*tensors)
+    tensors = [
+      (tensor, content_type)
+      for tensor, content_type in zip(tensors, summary._COMPONENTS) if tensor is not None
+    ]
+
+    pending = _Pending(
+      tag,
+      tensors,
+      description,
+      config_dict,
+      global_step,
+      # the event is written later, so the time of the call is recorded
+      time.time() if walltime is None else walltime
+    )
+
+    with self._condition:
+      while len(self._pending) >= self._max_pending:
+        if self._overflow == 'drop_oldest':
+          self._pending.popleft()
+          self.dropped += 1
+        else:
+          self._condition.wait()
+      self._pending.append(pending)
+      self._condition.notify_all()
+
+  def flush(self):
+    """Waits until all queued geometries are written and flushes the writer.
+    Raises the first error that occurred while writing in the background."""
+    with self._condition:
+      while self._pending or self._written < self._started:
+        self._condition.wait()
+      error, self._error = self._error, None
+
+    self._writer.flush()
+    if error is not None:
+      raise error
+
+  def close(self):
+    """Writes all queued geometries and stops the workers."""
+    if self._closed:
+      return
+    try:
+      self.flush()
+    finally:
+      with self._condition:
+        self._closed = True
+        self._condition.notify_all()
+      for worker in self._workers:
+        worker.join()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _work(self):
+    """Serializes queued geometries and writes them in their order."""
+    while True:
+      with self._condition:
+        while not self._pending and not self._closed:
+          self._condition.wait()
+        if not self._pending:
+          return
+        pending = self._pending.popleft()
+        index = self._started
+        self._started += 1
+        # a slot became free for a blocked add_geometry
+        self._condition.notify_all()
+
+      error = None
+      digests = None
+      try:
+        geometry = summary._geometry(
+          pending.tag,
+          description=pending.description,
+          config_dict=pending.config_dict,
+          **{_ARGUMENTS[content_type]: tensor for tensor, content_type in pending.tensors}
+        )
+        if self._keyframe_interval:
+          digests = [summary._tensor_digest(value.tensor) for value in geometry.value]
+      except Exception as err:
+        error = err
+
+      with self._turn:
+        while self._next_write != index:
+          self._turn.wait()
+      # Only this worker writes until it passes the turn on, while
+      # add_geometry can still queue geometries.
+      try:
+        if error is None:
+          # references depend on the previous writes, so they are chosen in order
+          summary._reference_unchanged(
+            self._writer, geometry.value, pending.global_step, self._keyframe_interval, digests
+          )
+          summary._store_in_sidecar(self._writer, geometry.value)
+          summary._write_summary(self._writer, geometry, pending.global_step, pending.walltime)
+      except Exception as err:
+        error = err
+      finally:
+        with self._turn:
+          self._next_write += 1
+          self._turn.notify_all()
+        with self._condition:
+          if error is not None and self._error is None:
+            self._error = error
+          self._written += 1
+          self._condition.notify_all()
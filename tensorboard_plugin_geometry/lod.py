@@ -0,0 +1,144 @@
+import numpy as np
+
+from .plugin_data_pb2 import GeoPluginData
+
+# Bisection steps of the voxel size and the fraction of max_points at which
+# the search stops early, see `_cluster_vertices`.
+_MAX_SEARCH_STEPS = 24
+_MIN_FILL = 0.9
+# Finest grid resolution, keys of its voxels fit into int64.
+_MAX_RESOLUTION = 2.0 ** 20
+
+# Components with one entry per vertex, which are subsampled together.
+VERTEX_COMPONENTS = [
+  GeoPluginData.VERTICES,
+  GeoPluginData.VERT_COLORS,
+  GeoPluginData.FEATURES,
+  GeoPluginData.FEAT_COLORS,
+]
+
+def decimate(components, max_points):
+  """Reduces the number of vertices of each sample to at most max_points.
+  Point clouds are subsampled with a fixed stride. Meshes are simplified by
+  clustering their vertices on a voxel grid and keeping one vertex per
+  voxel, faces are mapped onto the kept vertices. Colors and features are
+  subsampled with the same indices as the vertices, so that all components
+  stay consistent. The result is deterministic.
+  Args:
+    components: dict of GeoPluginData.ContentType to numpy arrays of shape
+      BxNx3 (FACE_COLORS: Bx3).
+    max_points: maximum number of vertices per sample.
+  Returns:
+    dict with the same keys and the decimated arrays.
+  """
+  vertices = components.get(GeoPluginData.VERTICES)
+  if vertices is None or vertices.ndim != 3 or vertices.shape[1] <= max_points:
+    return components
+
+  faces = components.get(GeoPluginData.FACES)
+  if faces is None or faces.ndim != 3:
+    step = -(-vertices.shape[1] // max_points)
+    indices = np.arange(0, vertices.shape[1], step)
+    return _take_vertices(components, [indices] * vertices.shape[0])
+
+  clusters = [
+    _cluster_vertices(sample_vertices, sample_faces, max_points)
+    for sample_vertices, sample_faces in zip(vertices, faces)
+  ]
+
+  # Samples of a batch must have the same number of vertices and faces, so
+  # they are padded by repeating a vertex and with degenerate faces.
+  n_vert = max(len(indices) for indices, _ in clusters)
+  n_face = max(max(len(sample_faces) for _, sample_faces in clusters), 1)
+  indices = [np.pad(indices, (0, n_vert - len(indices)), mode='edge') for indices, _ in clusters]
+
+  result = _take_vertices(components, indices)
+  result[GeoPluginData.FACES] = np.stack([
+    np.pad(sample_faces, ((0, n_face - len(sample_faces)), (0, 0)))
+    for _, sample_faces in clusters
+  ]).astype(faces.dtype, copy=False)
+  return result
+
+def _take_vertices(components, indices):
+  """Selects the vertices with the given indices for each sample."""
+  result = dict(components)
+  for content_type in VERTEX_COMPONENTS:
+    if content_type in components:
+      result[content_type] = np.stack([
+        sample[sample_indices]
+        for sample, sample_indices in zip(components[content_type], indices)
+      ])
+  return result
+
+def _cluster_vertices(vertices, faces, max_points):
+  """Clusters the vertices of one mesh on a voxel grid. The voxel size is
+  searched by bisection for the finest grid with at most max_points
+  occupied voxels, the search stops early once at least _MIN_FILL of
+  max_points are occupied.
+  Returns:
+    Tuple of the sorted indices of the kept vertices and the faces indexing
+    into them, without faces that collapsed into lines or points.
+  """
+  lower = vertices.min(axis=0)
+  extent = max(float((vertices.max(axis=0) - lower).max()), np.finfo(np.float32).eps)
+  normalized = (vertices - lower) / extent
+
+  # Surfaces occupy a number of voxels quadratic in the grid resolution.
+  resolution = max(np.sqrt(max_points), 1.0)
+  target = max_points * (1 + _MIN_FILL) / 2
+  # resolutions known to give at most and more than max_points voxels
+  fits, exceeds = 0.0, _MAX_RESOLUTION
+  first = inverse = None
+  # The number of voxels grows with the resolution like a power, whose
+  # exponent (2 for surfaces) is estimated from the last two grids.
+  exponent = 2.0
+  previous = None
+  for _ in range(_MAX_SEARCH_STEPS):
+    voxels = _voxels(normalized, resolution)
+    count = len(voxels[0])
+    if count <= max_points:
+      fits = resolution
+      first, inverse = voxels
+      if count >= max_points * _MIN_FILL:
+        break
+    else:
+      exceeds = resolution
+
+    if previous is not None and previous[1] != count:
+      exponent = np.clip(np.log(count / previous[1]) / np.log(resolution / previous[0]), 1.0, 3.0)
+    previous = (resolution, count)
+    # Bisection takes over when the guess leaves the bracket. Only
+    # duplicate vertices share voxels of the finest grid.
+    resolution = resolution * (target / count) ** (1 / exponent)
+    if not fits < resolution < exceeds:
+      resolution = (fits + exceeds) / 2
+    if exceeds - fits < 1e-6 * exceeds:
+      break
+  if first is None:
+    first, inverse = _voxels(normalized, 0.0)
+
+  # Keep the first vertex of each voxel and preserve the original order.
+  order = np.argsort(first)
+  new_index = np.empty_like(order)
+  new_index[order] = np.arange(len(order))
+
+  faces = new_index[inverse.reshape(-1)[faces]]
+  faces = faces[
+    (faces[:, 0] != faces[:, 1]) &
+    (faces[:, 1] != faces[:, 2]) &
+    (faces[:, 0] != faces[:, 2])
+  ]
+  return first[order], faces
+
+def _voxels(normalized, resolution):
+  """Assigns vertices scaled to [0, 1] to the voxels of a grid with
+  resolution voxels per unit.
+  Returns:
+    Tuple of the index of the first vertex of each occupied voxel and the
+    voxel of each vertex, see `np.unique`.
+  """
+  cells = (normalized * resolution).astype(np.int64)
+  size = int(resolution) + 1
+  keys = (cells[:, 0] * size + cells[:, 1]) * size + cells[:, 2]
+  _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+  return first, inverse
@@ -1,4 +1,7 @@
+from tensorboard.compat.proto import types_pb2
 from tensorboard.compat.proto.summary_pb2 import SummaryMetadata
+from tensorboard.compat.proto.tensor_pb2 import TensorProto
+from tensorboard.compat.proto.tensor_shape_pb2 import TensorShapeProto
 
 from .plugin_data_pb2 import GeoPluginData
 
@@ -91,3 +94,45 @@ def get_instance_name(tag, content_type):
     tag,
     GeoPluginData.ContentType.Name(content_type)
   )
+
+def create_reference_tensor(step):
+  """Creates a tensor that refers to the data of the same instance tag at a
+  previous step, written in place of components that did not change.
+  Components are never stored as int64, which marks references.
+  """
+  return TensorProto(
+    dtype=types_pb2.DT_INT64,
+    tensor_shape=TensorShapeProto(dim=[TensorShapeProto.Dim(size=1)]),
+    int64_val=[step],
+  )
+
+def get_reference_step(tensor_proto):
+  """Returns the step a reference tensor refers to or None if the tensor
+  contains data."""
+  if tensor_proto.dtype != types_pb2.DT_INT64:
+    return None
+  return tensor_proto.int64_val[0]
+
+def create_sidecar_tensor(tensor_proto, file_name, offset):
+  """Creates a tensor that refers to the content of tensor_proto, which is
+  stored at offset in a sidecar file next to the event file. The tensor
+  keeps dtype and shape, the file name and offset are stored as its
+  string and int64 values.
+  """
+  return TensorProto(
+    dtype=tensor_proto.dtype,
+    tensor_shape=tensor_proto.tensor_shape,
+    string_val=[file_name.encode()],
+    int64_val=[offset],
+  )
+
+def get_sidecar_location(tensor_proto):
+  """Returns the sidecar file name and offset of the content of a tensor or
+  None if the tensor contains its data."""
+  if (
+    tensor_proto.tensor_content or
+    not tensor_proto.string_val or
+    tensor_proto.dtype == types_pb2.DT_STRING
+  ):
+    return None
+  return tensor_proto.string_val[0].decode(), tensor_proto.int64_val[0]
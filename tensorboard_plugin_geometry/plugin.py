@@ -1,25 +1,70 @@
 
+import os
 import os.path as osp
+import gzip
 import json
-import numpy as np
+import re
+import threading
+import time
+import zlib
 import six
+from tensorboard import errors
 from tensorboard.plugins import base_plugin
-from tensorboard.util import tensor_util
 import werkzeug
 from werkzeug import wrappers
 
+from . import sampling
+from .byte_cache import ByteCache
 from .metadata import PLUGIN_NAME
+from .static_files import StaticFiles
+from .step_notifier import StepNotifier
 from .tag_server import TagServer
-from .data_server import DataServer
+
+# Default size of the buffer cache, overridden by the `--geometry_cache_mb`
+# flag or the GEOMETRY_CACHE_MB environment variable.
+DEFAULT_CACHE_MB = 256
+
+# Default number of threads decoding large components, overridden by the
+# `--geometry_decode_threads` flag.
+DEFAULT_DECODE_THREADS = min(8, os.cpu_count() or 1)
+
+# Binary responses smaller than this are sent uncompressed.
+_MIN_COMPRESS_SIZE = 1024
+# Geometry data hardly compresses any better with higher levels.
+_COMPRESS_LEVEL = 1
+# `/data` responses of at least this many bytes are streamed in chunks
+# instead of being built in memory.
+_MIN_STREAM_SIZE = 16 << 20
+# Seconds after which an idle event stream sends a comment, so that
+# closed connections are noticed.
+_HEARTBEAT_INTERVAL = 15
+# Seconds after which an inactive plugin checks the tags of known runs again.
+_ACTIVE_CHECK_INTERVAL = 10
+# zlib window bits of the compression formats
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+# Encodings of the bundle's files, preferred first if the client accepts
+# them equally.
+_STATIC_ENCODINGS = ['br', 'gzip']
 
 class GeoPlugin(base_plugin.TBPlugin):
   plugin_name = PLUGIN_NAME
 
   def __init__(self, context): # ...
     self._multiplexer = context.multiplexer
-    self._tag_server = TagServer(self._multiplexer, self.plugin_name)
-    self._data_server = DataServer(self._multiplexer, self._tag_server)
+    self._tag_server = TagServer(
+      self._multiplexer, self.plugin_name, sampling.from_flags(context.flags)
+    )
+    self._cache = ByteCache(_cache_size(context.flags))
+    self._decode_threads = getattr(context.flags, 'geometry_decode_threads', None) or DEFAULT_DECODE_THREADS
+    self._data_server_instance = None
+    self._data_server_lock = threading.Lock()
+    self._step_notifier = StepNotifier(self._tag_server)
+    self._static_files = StaticFiles()
     self._logdir = context.logdir
+    self._active = False
+    # runs and time of the last check while the plugin was inactive
+    self._checked_runs = None
+    self._checked_time = 0
 
   def get_plugin_apps(self):
     return {
@@ -28,7 +73,10 @@ class GeoPlugin(base_plugin.TBPlugin):
       "/assets/*": self._serve_assets,
       "/tags": self._serve_tags,
       "/data": self._serve_data,
+      "/step": self._serve_step,
       "/geometries": self._serve_metadata,
+      "/cache": self._serve_cache_stats,
+      "/events": self._serve_events,
       "/logdir": self._serve_logdir
     }
 
@@ -37,14 +85,41 @@ class GeoPlugin(base_plugin.TBPlugin):
     """Determines whether this plugin is active.
     This plugin is only active if TensorBoard sampled any summaries
     relevant to the geometry plugin.
+    Once active, the plugin stays active. Otherwise the tags are only
+    checked again if runs were added or some time passed, since TensorBoard
+    asks on every page load.
     Returns:
       Whether this plugin is active.
     """
+    if self._active or not self._multiplexer:
+      return self._active
+
+    runs = self._multiplexer.RunPaths()
+    now = time.time()
+    if runs == self._checked_runs and now - self._checked_time < _ACTIVE_CHECK_INTERVAL:
+      return False
+    self._checked_runs = runs
+    self._checked_time = now
+
     all_runs = self._multiplexer.PluginRunToTagToContent(self.plugin_name)
 
     # The plugin is active if any of the runs has a tag relevant
     # to the plugin.
-    return bool(self._multiplexer and any(six.itervalues(all_runs)))
+    self._active = any(six.itervalues(all_runs))
+    return self._active
+
+  @property
+  def _data_server(self):
+    """The DataServer, created on the first data request, so that numpy and
+    the modules encoding geometries are not imported while TensorBoard
+    starts."""
+    with self._data_server_lock:
+      if self._data_server_instance is None:
+        from .data_server import DataServer
+        self._data_server_instance = DataServer(
+          self._multiplexer, self._tag_server, self._cache, self._decode_threads
+        )
+      return self._data_server_instance
 
   def frontend_metadata(self):
     return base_plugin.FrontendMetadata(es_module_path = "/app", tab_name = "Geometries")
@@ -52,42 +127,92 @@ class GeoPlugin(base_plugin.TBPlugin):
   ### Route handling
   @wrappers.Request.application
   def _serve_js(self, request):
-    base_path = osp.join(osp.dirname(__file__), "static", "bundle")
-    req_path = request.path.split('/')
-    req_path = req_path[len(req_path) - 1]
-
-    if req_path == 'app':
-      filepath = osp.join(base_path, "render.js")
-    elif req_path == 'index':
-      filepath = osp.join(base_path, 'index.js')
-    
-    with open(filepath, 'r', encoding='utf8') as infile:
-      contents = infile.read()
-    return werkzeug.Response(
-      contents, content_type="application/javascript",
-      headers=[
-        ('X-Content-Type-Options', 'nosniff')
-      ]
-    )
+    """A route that serves the entry module `app` and the bundle `index`."""
+    name = request.path.split('/')[-1]
+    if name == 'app':
+      static_file = self._static_files.get('render.js', self._version_bundle_import)
+    elif name == 'index':
+      static_file = self._bundle()
+    else:
+      static_file = None
+    return self._static_response(request, static_file)
 
   @wrappers.Request.application
   def _serve_assets(self, request):
-    base_path = osp.join(osp.dirname(__file__), "static", "bundle", "assets")
-    req_path = request.path.split('/')
-    req_path = req_path[len(req_path) - 1]
-    
-    filepath = osp.join(base_path, req_path)
-    file_size = osp.getsize(filepath)
-    
-    return werkzeug.Response(
-      open(filepath, 'rb'),
-      mimetype='application/octet-stream',
-      headers=[
-        ('Content-Length', str(file_size)),
-        ('Content-Disposition', "attachment; filename=\"%s\"" % req_path),
-        ('X-Content-Type-Options', 'nosniff')
-      ],
-      direct_passthrough=True)
+    """A route that serves fonts and other assets of the bundle."""
+    name = osp.basename(request.path)
+    if name not in self._static_files.list('assets'):
+      return self._static_response(request, None)
+    return self._static_response(request, self._static_files.get(osp.join('assets', name)))
+
+  def _bundle(self):
+    """Gets the bundle `index.js` with versioned URLs of its assets."""
+    return self._static_files.get('index.js', self._version_asset_urls)
+
+  def _version_bundle_import(self, content):
+    """Adds the hash of the bundle to its import in the entry module, so that
+    browsers can cache the bundle until it changes."""
+    bundle = self._bundle()
+    if bundle is None:
+      return content
+    return content.replace(b"'./app/index'", b"'./app/index?v=%s'" % bundle.etag.encode())
+
+  def _version_asset_urls(self, content):
+    """Adds the hash of each asset, e.g. of the fonts, to its URLs in the
+    bundle, so that browsers can cache the assets until they change."""
+    for name in self._static_files.list('assets'):
+      asset = self._static_files.get(osp.join('assets', name))
+      if asset is not None:
+        content = re.sub(
+          rb'(assets/%s)(?=["\')])' % re.escape(name.encode()),
+          rb'\1?v=%s' % asset.etag.encode(),
+          content
+        )
+    return content
+
+  def _static_response(self, request, static_file):
+    """Creates a cacheable, compressed response for a file of the bundle.
+    Args:
+      request: werkzeug.Request with the client's caching and encoding headers.
+      static_file: StaticFile to send or None, if it does not exist.
+    Returns:
+      werkzeug.Response with status 200, 304 or 404.
+    """
+    if static_file is None:
+      return werkzeug.Response('Not found', status=404, content_type='text/plain')
+
+    encoding = request.accept_encodings.best_match(
+      [encoding for encoding in _STATIC_ENCODINGS if encoding in static_file.variants]
+    )
+    etag = static_file.etag
+    if encoding:
+      etag = '%s-%s' % (etag, encoding)
+
+    headers = [
+      ('X-Content-Type-Options', 'nosniff'),
+      ('Vary', 'Accept-Encoding'),
+    ]
+    # URLs with the hash of the file never change, others are revalidated.
+    if request.args.get('v') == static_file.etag:
+      headers.append(('Cache-Control', 'public, max-age=31536000, immutable'))
+    else:
+      headers.append(('Cache-Control', 'no-cache'))
+
+    for cached_etag in etags:
+      if request.if_none_match.contains(cached_etag):
+        res = werkzeug.Response(status=304, headers=headers)
+        res.set_etag(cached_etag)
+        return res
+
+    if encoding:
+      headers.append(('Content-Encoding', encoding))
+    res = werkzeug.Response(
+      static_file.variants.get(encoding, static_file.content),
+      content_type=static_file.content_type,
+      headers=headers
+    )
+    res.set_etag(etag)
+    return res
 
   @wrappers.Request.application
   def _serve_tags(self, request):
@@ -97,10 +222,20 @@ class GeoPlugin(base_plugin.TBPlugin):
     Returns:
       A response that contains a JSON object. The keys of the object
       are all the runs. Each run is mapped to a (potentially empty)
-      list of all tags that are relevant to this plugin.
+      list of all tags that are relevant to this plugin. With a `since`
+      token only the changes are sent, see `TagServer.get_tag_changes`,
+      or an empty 304 response if nothing changed.
     """
+    since = request.args.get("since")
+    if since is None:
+      response = self._tag_server.get_tags_response()
+    else:
+      response = self._tag_server.get_tag_changes(since)
+      if response is None:
+        return _not_modified()
+
     return werkzeug.Response(
-      json.dumps(self._tag_server.get_tags_response()),
+      json.dumps(response),
       content_type="application/json",
       headers=[
         ('X-Content-Type-Options', 'nosniff')
@@ -114,29 +249,153 @@ class GeoPlugin(base_plugin.TBPlugin):
     vertices colors and so on. Each mesh may have different combination of
     abovementioned data and each type/part of mesh summary must be served as
     separate roundtrip to the server.
+    Large responses are streamed with chunked transfer encoding, so that
+    clients can process the first chunks while the rest is still sent.
     Args:
       request: werkzeug.Request containing content_type as a name of enum
         GeoPluginData.ContentType.
     Returns:
-      werkzeug.Response either float32 or int32 data in binary format.
+      werkzeug.Response either float32 or int32 data in binary format, for
+      `precision=uint16` with the bounds to decode it as JSON in the
+      `X-Geometry-Bounds` header,
+      status 400 for malformed arguments or 404 for unknown runs and tags.
     """
     try:
-      response = self._data_server.get_data_response(request, self.plugin_name)
-    
+      version = self._data_server.get_data_version(request, request.args.get("content_type"))
+
+      return self._binary_response(
+        request,
+        version,
+        lambda: self._data_server.get_data_response(request, self.plugin_name),
+        lambda: self._data_server.get_data_stream(request, _MIN_STREAM_SIZE),
+        lambda: _bounds_headers(self._data_server.get_data_bounds(request)))
     except ValueError as err:
-      raise err
-      res = werkzeug.Response("Bad content_type", "text/plain", headers=[
-      ('X-Content-Type-Options', 'nosniff')
-    ])
-      res.status_code = 400
+      return _bad_request(err)
+    except errors.NotFoundError as err:
+      return _not_found(err)
+
+  @wrappers.Request.application
+  def _serve_step(self, request):
+    """A route that returns all components of a summary at one step.
+    In contrast to `/data`, vertices, faces, colors and features are served
+    in one roundtrip as a framed binary payload (see
+    `DataServer.get_step_response`). Large payloads are streamed like
+    those of `/data`.
+    Args:
+      request: werkzeug.Request containing run, tag and step.
+    Returns:
+      werkzeug.Response with the framed components in binary format,
+      status 400 for malformed arguments or 404 for unknown runs and tags.
+    """
+    try:
+      return self._binary_response(
+        request,
+        self._data_server.get_data_version(request),
+        lambda: self._data_server.get_step_response(request),
+        lambda: self._data_server.get_step_stream(request, _MIN_STREAM_SIZE))
+    except ValueError as err:
+      return _bad_request(err)
+    except errors.NotFoundError as err:
+      return _not_found(err)
+
+  def _binary_response(self, request, version, get_payload, get_stream=None, get_headers=None):
+    """Creates a cacheable, possibly compressed response for binary data.
+    Args:
+      request: werkzeug.Request with the client's caching and encoding headers.
+      version: tuple of ETag and whether the step is finished, see
+        `DataServer.get_data_version`.
+      get_payload: callable returning the binary data. It is not called if the
+        client's cached version is still valid.
+      get_stream: optional callable returning an iterator over the chunks of
+        the data or None, if it should not be streamed.
+      get_headers: optional callable returning a list of headers describing
+        the data, only called for responses with data.
+    Returns:
+      werkzeug.Response with status 200 or 304.
+    """
+    etag, finished = version
+    encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+    # Each encoding is a different representation and needs its own tag.
+    # Small payloads are sent uncompressed with the plain tag.
+    etags = [etag, '%s-%s' % (etag, encoding)] if encoding else [etag]
+
+    headers = [
+      ('X-Content-Type-Options', 'nosniff'),
+      ('Vary', 'Accept-Encoding'),
+    ]
+    # Finished steps requested for their wall time never change.
+    timestamp = request.args.get("timestamp")
+    if finished and timestamp is not None:
+      headers.append(('Cache-Control', 'public, max-age=31536000, immutable'))
+    else:
+      headers.append(('Cache-Control', 'no-cache'))
+
+    for cached_etag in etags:
+      if request.if_none_match.contains(cached_etag):
+        res = werkzeug.Response(status=304, headers=headers)
+        res.set_etag(cached_etag)
+        return res
+
+    if get_headers is not None:
+      headers += get_headers()
+
+    chunks = get_stream() if get_stream is not None else None
+    if chunks is not None:
+      # Without a content length the server sends the chunks as they are
+      # produced with `Transfer-Encoding: chunked`.
+      if encoding:
+        chunks = _compress_chunks(chunks, encoding)
+        headers.append(('Content-Encoding', encoding))
+      res = werkzeug.Response(chunks, mimetype="application/octet-stream", headers=headers, direct_passthrough=True)
+      res.set_etag(etags[-1])
       return res
 
-    res = werkzeug.Response(response, "arraybuffer", headers=[
-      ('X-Content-Type-Options', 'nosniff')
-    ])
+    payload = get_payload()
+    if len(payload) < _MIN_COMPRESS_SIZE:
+      encoding = None
+    elif encoding == 'gzip':
+      payload = gzip.compress(payload, compresslevel=_COMPRESS_LEVEL)
+    elif encoding == 'deflate':
+      payload = zlib.compress(payload, _COMPRESS_LEVEL)
+
+    if encoding:
+      headers.append(('Content-Encoding', encoding))
+
+    res = werkzeug.Response(payload, mimetype="application/octet-stream", headers=headers)
+    res.set_etag(etags[-1] if encoding else etag)
     res.status_code = 200
     return res
 
+  @wrappers.Request.application
+  def _serve_cache_stats(self, request):
+    """A route that returns size and hit/miss counters of the buffer cache."""
+    return werkzeug.Response(
+      json.dumps(self._data_server.get_cache_stats()),
+      content_type="application/json",
+      headers=[
+        ('X-Content-Type-Options', 'nosniff')
+      ]
+    )
+
+  @wrappers.Request.application
+  def _serve_events(self, request):
+    """A route that streams Server-Sent Events. Each `step` event has a
+    JSON object with the run, tag, step, wall time and content types of the
+    components of a newly loaded step. Clients reconnecting with the
+    `Last-Event-ID` header get the steps they missed.
+    """
+    last_id = request.headers.get('Last-Event-ID', '')
+    response = werkzeug.Response(
+      _event_stream(self._step_notifier, int(last_id) if last_id.isdigit() else None),
+      content_type="text/event-stream",
+      direct_passthrough=True,
+      headers=[
+        ('Cache-Control', 'no-cache'),
+        ('X-Content-Type-Options', 'nosniff')
+      ]
+    )
+    return response
+
   @wrappers.Request.application
   def _serve_logdir(self, request):
     return werkzeug.Response(
@@ -151,13 +410,31 @@ class GeoPlugin(base_plugin.TBPlugin):
   def _serve_metadata(self, request):
       """A route that returns the mesh metadata associated with a tag.
       Metadata consists of wall time, type of elements in tensor, scene
-      configuration and so on.
+      configuration and so on. With `stats=1` the statistics of each sample
+      of vertices and features are included as well (see
+      `stats.get_sample_stats`).
       Args:
         request: The werkzeug.Request object.
       Returns:
         A JSON list of mesh data associated with the run and tag
-        combination.
+        combination. With a `since` token only the entries of steps that
+        changed since are sent, as an object with the new `token`, whether
+        all steps are sent (`reset`), the `changed` entries and the
+        `removed` steps, or an empty 304 response if nothing changed.
+        Status 400 for malformed arguments, 404 for unknown runs and tags.
       """
+      try:
+        return self._metadata_response(request)
+      except ValueError as err:
+        return _bad_request(err)
+      except errors.NotFoundError as err:
+        return _not_found(err)
+
+  def _metadata_response(self, request):
+      """Creates the response of `_serve_metadata`."""
+      run = request.args.get("run")
+      tag = request.args.get("tag")
+      since = request.args.get("since")
       tensor_events = self._tag_server.collect_tensor_events(request)
 
       # We convert the tensor data to text.
@@ -171,6 +448,33 @@ class GeoPlugin(base_plugin.TBPlugin):
           "description": description,
       } for meta, event, description in tensor_events]
 
+      # Clients set up the camera and colormaps with them before loading data.
+      # They are computed once per step and cached.
+      with_stats = request.args.get("stats") == '1'
+      if with_stats:
+        from . import stats
+        for entry, (meta, event, _) in zip(response, tensor_events):
+          if meta.content_type in stats.COMPONENTS:
+            entry["stats"] = self._data_server.get_stats(run, tag, meta.content_type, event)
+
+      if since is not None:
+        by_step = dict()
+        for entry in response:
+          by_step.setdefault(entry["step"], []).append(entry)
+        # Responses with and without stats change independently.
+        scope = ('geometries', run, tag, with_stats)
+        self._tag_server.change_log.update(scope, by_step)
+        token, reset, changed, removed = self._tag_server.change_log.changes(scope, since)
+        if not reset and not changed and not removed:
+          return _not_modified()
+
+        response = {
+          "token": token,
+          "reset": reset,
+          "changed": [entry for step in sorted(changed) for entry in by_step.get(step, [])],
+          "removed": sorted(removed),
+        }
+
       res = werkzeug.Response(json.dumps(response), "application/json",
         headers=[
           ('X-Content-Type-Options', 'nosniff')
@@ -178,3 +482,53 @@ class GeoPlugin(base_plugin.TBPlugin):
       res.status_code = 200
       return res
 
+def _bad_request(err):
+  """Creates the response to a request with malformed arguments."""
+  return werkzeug.Response(str(err), status=400, content_type='text/plain')
+
+def _bounds_headers(bounds):
+  """Creates the header with the bounds of quantized `/data`, if any."""
+  if bounds is None:
+    return []
+  return [('X-Geometry-Bounds', json.dumps(bounds))]
+
+def _not_found(err):
+  """Creates the response to a request for an unknown run or tag."""
+  return werkzeug.Response(str(err), status=404, content_type='text/plain')
+
+def _not_modified():
+  """Creates the empty response of a `since` request without changes."""
+  return werkzeug.Response(status=304, headers=[
+    ('X-Content-Type-Options', 'nosniff')
+  ])
+
+def _event_stream(notifier, last_id):
+  """Yields the Server-Sent Events of the notifications after last_id,
+    or of new notifications if last_id is None."""
+  last_id = notifier.subscribe(last_id)
+  try:
+    yield b'retry: 5000\n\n'
+    while True:
+      notifications = notifier.wait(last_id, _HEARTBEAT_INTERVAL)
+      if not notifications:
+        yield b': heartbeat\n\n'
+      for last_id, notification in notifications:
+        yield ('id: %d\nevent: step\ndata: %s\n\n' % (last_id, json.dumps(notification))).encode()
+  finally:
+    notifier.unsubscribe()
+
+def _compress_chunks(chunks, encoding):
+  """Compresses a stream of chunks with gzip or deflate."""
+  compressor = zlib.compressobj(_COMPRESS_LEVEL, zlib.DEFLATED, _WBITS[encoding])
+  for chunk in chunks:
+    data = compressor.compress(chunk)
+    if data:
+      yield data
+  yield compressor.flush()
+
+def _cache_size(flags):
+  """Gets the size of the buffer cache in bytes from flags or environment."""
+  size_mb = getattr(flags, 'geometry_cache_mb', None)
+  if size_mb is None:
+    size_mb = float(os.environ.get('GEOMETRY_CACHE_MB', DEFAULT_CACHE_MB))
+  return int(size_mb * 1024 * 1024)
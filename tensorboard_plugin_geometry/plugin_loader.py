@@ -0,0 +1,94 @@
+from tensorboard.plugins import base_plugin
+
+from .metadata import PLUGIN_NAME
+from .sampling import DEFAULT_LOADED_STEPS, DEFAULT_SAMPLES, DEFAULT_STRIDE, POLICIES
+
+class GeoPluginLoader(base_plugin.TBLoader):
+  """Adds the plugin's command line flags and loads the plugin."""
+
+  def define_flags(self, parser):
+    group = parser.add_argument_group(PLUGIN_NAME)
+    group.add_argument(
+      '--geometry_cache_mb',
+      metavar='MB',
+      type=float,
+      default=None,
+      help='''\
+Size of the in-memory cache of serialized geometry buffers shared by all
+requests, in megabytes. 0 disables the cache. Defaults to the
+GEOMETRY_CACHE_MB environment variable or 256.''')
+    group.add_argument(
+      '--geometry_decode_threads',
+      metavar='N',
+      type=int,
+      default=None,
+      help='''\
+Number of threads converting and copying large geometries for a request, 1
+decodes on the request thread. Defaults to the number of CPUs, at most 8.''')
+    group.add_argument(
+      '--geometry_samples',
+      metavar='N',
+      type=int,
+      default=None,
+      help='''\
+Number of steps of each geometry listed, 0 lists all loaded steps. Defaults
+to the `geometries` entry of --samples_per_plugin or %d.''' % DEFAULT_SAMPLES)
+    group.add_argument(
+      '--geometry_sampling',
+      choices=POLICIES,
+      default='reservoir',
+      help='''\
+How the kept steps are chosen: `reservoir` keeps a random sample like other
+plugins, `last` the most recent steps, `even` evenly spaced steps and `every`
+the steps that are multiples of --geometry_sampling_stride. The most recent
+step is always kept. Policies other than `reservoir` choose from the steps
+loaded by --geometry_loaded_steps. (default: %(default)s)''')
+    group.add_argument(
+      '--geometry_sampling_stride',
+      metavar='K',
+      type=int,
+      default=DEFAULT_STRIDE,
+      help='''\
+Keep steps that are multiples of K with --geometry_sampling every.
+(default: %(default)s)''')
+    group.add_argument(
+      '--geometry_loaded_steps',
+      metavar='N',
+      type=int,
+      default=DEFAULT_LOADED_STEPS,
+      help='''\
+Number of steps of each geometry TensorBoard keeps in memory for the
+--geometry_sampling policies other than `reservoir` to choose from. Bounds
+the memory used by the plugin, TensorBoard samples the loaded steps randomly
+once there are more. 0 loads all steps. (default: %(default)s)''')
+
+  def fix_flags(self, flags):
+    if flags.geometry_cache_mb is not None and flags.geometry_cache_mb < 0:
+      raise base_plugin.FlagsError('--geometry_cache_mb must not be negative')
+    if flags.geometry_decode_threads is not None and flags.geometry_decode_threads < 1:
+      raise base_plugin.FlagsError('--geometry_decode_threads must be positive')
+    if flags.geometry_samples is not None and flags.geometry_samples < 0:
+      raise base_plugin.FlagsError('--geometry_samples must not be negative')
+    if flags.geometry_sampling_stride < 1:
+      raise base_plugin.FlagsError('--geometry_sampling_stride must be positive')
+    if flags.geometry_loaded_steps < 0:
+      raise base_plugin.FlagsError('--geometry_loaded_steps must not be negative')
+
+    # The multiplexer sizes the reservoirs of the plugin's tags from
+    # samples_per_plugin, which is left alone unless a flag of the plugin
+    # sets how many steps TensorBoard keeps.
+    samples_per_plugin = getattr(flags, 'samples_per_plugin', None)
+    if samples_per_plugin is None:
+      return
+    if flags.geometry_sampling != 'reservoir':
+      if flags.geometry_samples is None:
+        flags.geometry_samples = samples_per_plugin.get(PLUGIN_NAME, DEFAULT_SAMPLES)
+      if 0 < flags.geometry_loaded_steps < flags.geometry_samples:
+        raise base_plugin.FlagsError('--geometry_loaded_steps must be 0 or at least --geometry_samples')
+      samples_per_plugin[PLUGIN_NAME] = flags.geometry_loaded_steps
+    elif flags.geometry_samples is not None:
+      samples_per_plugin[PLUGIN_NAME] = flags.geometry_samples
+
+  def load(self, context):
+    from .plugin import GeoPlugin
+    return GeoPlugin(context)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from .plugin_data_pb2 import GeoPluginData
+
+# Components with float coordinates that can be sent with lower precision.
+COMPONENTS = [GeoPluginData.VERTICES, GeoPluginData.FEATURES]
+
+# Supported transport precisions of COMPONENTS.
+PRECISIONS = ['float32', 'float16', 'uint16']
+
+_UINT16_MAX = np.iinfo(np.uint16).max
+
+def get_bounds(array):
+  """Returns the axis aligned bounding box of an array of shape [..., 3]
+  as [[min_x, min_y, min_z], [max_x, max_y, max_z]]."""
+  points = array.reshape(-1, array.shape[-1])
+  if len(points) == 0:
+    return [[0.0] * points.shape[1], [0.0] * points.shape[1]]
+  return [points.min(axis=0).tolist(), points.max(axis=0).tolist()]
+
+def union_bounds(bounds):
+  """Returns the bounding box of a list of bounding boxes."""
+  return [
+    np.min([lower for lower, _ in bounds], axis=0).tolist(),
+    np.max([upper for _, upper in bounds], axis=0).tolist(),
+  ]
+
+def encode(array, precision, bounds=None):
+  """Encodes a float32 array of shape [..., 3] for transport.
+  Args:
+    array: float32 numpy array.
+    precision: one of PRECISIONS. `float16` values beyond +-65504 become
+      infinite. `uint16` quantizes each axis linearly between bounds.
+    bounds: bounding box of the values, required for `uint16`. The client
+      decodes values as `lower + q / 65535 * (upper - lower)`.
+  Returns:
+    The encoded numpy array.
+  """
+  if precision == 'float32':
+    return array
+  if precision == 'float16':
+    return array.astype(np.float16)
+  if precision == 'uint16':
+    lower = np.asarray(bounds[0], dtype=np.float32)
+    extent = np.asarray(bounds[1], dtype=np.float32) - lower
+    extent[extent == 0] = 1
+    points = array.reshape(-1, len(lower))
+    quantized = np.rint((points - lower) / extent * _UINT16_MAX)
+    return np.clip(quantized, 0, _UINT16_MAX).astype(np.uint16).reshape(array.shape)
+
+  raise ValueError("Unknown precision %s, expected one of %s." % (precision, PRECISIONS))
@@ -0,0 +1,85 @@
+from .metadata import PLUGIN_NAME
+
+# Policies choosing the steps of each geometry that are kept in memory.
+POLICIES = ['reservoir', 'last', 'even', 'every']
+
+# Default number of steps kept per geometry, overridden by the
+# `--geometry_samples` flag or `--samples_per_plugin geometries=N`.
+DEFAULT_SAMPLES = 10
+
+# Default k of the `every` policy.
+DEFAULT_STRIDE = 10
+
+# Default number of steps of each geometry TensorBoard loads for policies
+# other than `reservoir` to choose from, see `--geometry_loaded_steps`.
+DEFAULT_LOADED_STEPS = 1000
+
+class SamplingPolicy():
+  """Chooses the steps of an instance tag to keep in memory.
+
+  `reservoir` leaves sampling to TensorBoard, which keeps a uniformly random
+  sample of `samples` steps. For the other policies TensorBoard keeps a
+  larger sample of steps, of which only the chosen ones are listed:
+
+    last: the `samples` most recent steps.
+    even: steps that are multiples of a power of two, at most `samples`.
+      The spacing doubles whenever more steps would be kept, so the kept
+      steps cover the whole run.
+    every: steps that are multiples of `stride`, at most the `samples` most
+      recent of them.
+
+  The most recent step is always kept. `samples` 0 keeps all steps.
+  """
+
+  def __init__(self, name='reservoir', samples=DEFAULT_SAMPLES, stride=DEFAULT_STRIDE):
+    if name not in POLICIES:
+      raise ValueError("Unknown sampling policy %s, expected one of %s." % (name, POLICIES))
+    if samples < 0 or stride < 1:
+      raise ValueError("samples must not be negative and stride must be positive, but got %d and %d" % (samples, stride))
+    self.name = name
+    self.samples = samples
+    self.stride = stride
+
+  @property
+  def trims(self):
+    """Whether the plugin drops steps itself instead of TensorBoard."""
+    return self.name != 'reservoir'
+
+  def select(self, steps):
+    """Chooses the steps to keep.
+    Args:
+      steps: sorted list of distinct loaded steps.
+    Returns:
+      set of steps to keep.
+    """
+    if not steps or not self.trims:
+      return set(steps)
+
+    if self.name == 'every':
+      kept = [step for step in steps if step % self.stride == 0]
+    elif self.name == 'even' and self.samples > 1:
+      stride = 1
+      kept = steps
+      while len(kept) > self.samples - 1:
+        kept = [step for step in steps[:-1] if step % stride == 0]
+        stride *= 2
+    else:
+      kept = steps
+
+    if kept[-1:] != steps[-1:]:
+      kept = kept + steps[-1:]
+    if self.samples:
+      kept = kept[-self.samples:]
+    return set(kept)
+
+def from_flags(flags):
+  """Creates the SamplingPolicy configured by the command line flags."""
+  samples = getattr(flags, 'geometry_samples', None)
+  if samples is None:
+    samples = getattr(flags, 'samples_per_plugin', None) or {}
+    samples = samples.get(PLUGIN_NAME, DEFAULT_SAMPLES)
+  return SamplingPolicy(
+    getattr(flags, 'geometry_sampling', 'reservoir'),
+    samples,
+    getattr(flags, 'geometry_sampling_stride', DEFAULT_STRIDE)
+  )
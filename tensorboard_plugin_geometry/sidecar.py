@@ -0,0 +1,148 @@
+import itertools
+import mmap
+import os
+import socket
+import threading
+import time
+
+from tensorboard.compat.proto import types_pb2
+
+# Blocks in sidecar files start at multiples of this number of bytes, so
+# that they can be viewed as typed arrays.
+_ALIGNMENT = 8
+
+# Bytes per value of the dtypes components are stored with.
+_ITEM_SIZES = {
+  types_pb2.DT_FLOAT: 4,
+  types_pb2.DT_INT32: 4,
+  types_pb2.DT_UINT8: 1,
+}
+
+_counter = itertools.count()
+
+class SidecarTensor():
+  """Stands in for the TensorProto of a component stored in a sidecar file.
+  Its `tensor_content` is a view of the memory mapped file, so the data is
+  only read from disk when it is served.
+
+  The view is taken from the reader's current mapping of the file on each
+  access, so that mappings replaced while the file grows are released once
+  no request uses them anymore.
+  """
+
+  def __init__(self, dtype, tensor_shape, reader, path, offset, length):
+    self.dtype = dtype
+    self.tensor_shape = tensor_shape
+    self._reader = reader
+    self._path = path
+    self._offset = offset
+    self._length = length
+
+  @property
+  def tensor_content(self):
+    return self._reader.view(self._path, self._offset, self._length)
+
+class SidecarWriter():
+  """Appends the raw bytes of large components to a file next to the event
+  file, whose summaries only refer to them by file name and offset."""
+
+  def __init__(self, logdir):
+    self.file_name = 'geometries.%d.%s.%d.%d.bin' % (
+      time.time(), socket.gethostname(), os.getpid(), next(_counter)
+    )
+    self._path = os.path.join(logdir, self.file_name)
+    self._file = None
+    self._size = 0
+    self._lock = threading.Lock()
+
+  def append(self, data):
+    """Appends data and returns its offset in the file. The data is flushed
+    before its summary is written, so readers never see incomplete blocks."""
+    with self._lock:
+      if self._file is None:
+        self._file = open(self._path, 'ab')
+        self._size = self._file.tell()
+
+      self._file.write(b'\0' * (-self._size % _ALIGNMENT))
+      self._size += -self._size % _ALIGNMENT
+      offset = self._size
+
+      self._file.write(data)
+      self._file.flush()
+      self._size += len(data)
+      return offset
+
+  def close(self):
+    with self._lock:
+      if self._file is not None:
+        self._file.close()
+        self._file = None
+
+class SidecarReader():
+  """Memory maps sidecar files and returns views of their blocks. Each file
+  has one current mapping, which is replaced by a longer one once the file
+  grew."""
+
+  def __init__(self):
+    # path -> current mmap of the file
+    self._maps = {}
+    self._lock = threading.Lock()
+
+  def get_tensor(self, directory, tensor_proto, file_name, offset):
+    """Creates the SidecarTensor for a tensor that refers to a sidecar file,
+    see `metadata.create_sidecar_tensor`.
+    Returns:
+      SidecarTensor or None, if the block cannot be read.
+    """
+    if tensor_proto.dtype not in _ITEM_SIZES:
+      return None
+
+    length = _ITEM_SIZES[tensor_proto.dtype]
+    for dim in tensor_proto.tensor_shape.dim:
+      length *= dim.size
+
+    path = os.path.join(directory, os.path.basename(file_name))
+    if self._map(path, offset + length) is None:
+      return None
+    return SidecarTensor(tensor_proto.dtype, tensor_proto.tensor_shape, self, path, offset, length)
+
+  def read(self, directory, file_name, offset, length):
+    """Gets a view of a block of a sidecar file.
+    Args:
+      directory: directory of the run the file belongs to.
+      file_name: name of the sidecar file.
+      offset: offset of the block in bytes.
+      length: length of the block in bytes.
+    Returns:
+      memoryview of the block or None, if it cannot be read.
+    """
+    path = os.path.join(directory, os.path.basename(file_name))
+    if self._map(path, offset + length) is None:
+      return None
+    return self.view(path, offset, length)
+
+  def view(self, path, offset, length):
+    """Gets a view of a block of a mapped file, see `read`."""
+    with self._lock:
+      return memoryview(self._maps[path])[offset:offset + length]
+
+  def _map(self, path, size):
+    """Gets the current mapping of a file, mapped again if it is shorter
+    than size, or None if the file cannot be mapped with that size."""
+    with self._lock:
+      mapped = self._maps.get(path)
+      if mapped is not None and len(mapped) >= size:
+        return mapped
+
+      # Files grow while the run is written. The old mapping is closed once
+      # the last view of it is released.
+      try:
+        with open(path, 'rb') as f:
+          mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      except (OSError, ValueError):
+        return None
+      if len(mapped) < size:
+        mapped.close()
+        return None
+      self._maps[path] = mapped
+      return mapped
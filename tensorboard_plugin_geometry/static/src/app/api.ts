@@ -1,7 +1,16 @@
 import 'axios';
 import Axios from 'axios';
 import { StepMetadata } from './models/step';
-import { DataResponse, MetadataResponse, TagsResponse } from './models/responses';
+import { DataResponse, DataShapes, MetadataChanges, MetadataResponse, StepHeader, TagChanges, TagsResponse, TransportPrecision } from './models/responses';
+
+// typed arrays for the dtypes of the components in a step payload
+const ARRAY_TYPES = {
+  float32: Float32Array,
+  int32: Uint32Array, // face indices are never negative
+  uint8: Uint8Array,
+  float16: Uint16Array, // decoded to Float32Array
+  uint16: Uint16Array, // dequantized to Float32Array with the bounds of the component
+};
 
 export class ApiService {
   static base_path = '/data/plugin/geometries/';
@@ -10,82 +19,176 @@ export class ApiService {
     return await Axios.get('./tags') as TagsResponse;
   }
 
+  /**
+   * get the runs and tags changed since the token of an earlier call
+   *
+   * @param since token of the last changes, all tags are sent for an empty token
+   * @returns the changes or undefined if nothing changed
+   */
+  static async getTagChanges(since = ''): Promise<TagChanges | undefined> {
+    const res = await Axios.get(`./tags?since=${since}`, { validateStatus: this._okOrNotModified });
+    return res.status === 304 ? undefined : res.data;
+  }
+
   static async getLogdir() {
     return await Axios.get('./logdir');
   }
 
   static async getMetadata(run: string, tag: string): Promise<MetadataResponse> {
-    return await Axios.get(`./geometries?tag=${tag}&run=${run}`);
+    return await Axios.get(`./geometries?tag=${tag}&run=${run}&stats=1`);
   }
 
-  static async getData(run: string, tag: string, step: number, meta_data: StepMetadata): Promise<DataResponse> {
-    const resp: DataResponse = {};
-    if (meta_data.VERTICES) {
-      resp['vertices'] = await ApiService.getVertices(run, tag, step, meta_data.VERTICES.wall_time);
-    }
-    if (meta_data.VERT_COLORS) {
-      resp['vert_colors'] = await ApiService.getVertColors(run, tag, step, meta_data.VERT_COLORS.wall_time);
-    }
-    if (meta_data.FEATURES) {
-      resp['features'] = await ApiService.getFeatures(run, tag, step, meta_data.FEATURES.wall_time);
+  /**
+   * get the metadata of the steps changed since the token of an earlier call
+   *
+   * @param since token of the last changes, all steps are sent for an empty token
+   * @returns the changes or undefined if nothing changed
+   */
+  static async getMetadataChanges(run: string, tag: string, since = ''): Promise<MetadataChanges | undefined> {
+    const res = await Axios.get(`./geometries?tag=${tag}&run=${run}&stats=1&since=${since}`, { validateStatus: this._okOrNotModified });
+    return res.status === 304 ? undefined : res.data;
+  }
+
+  private static _okOrNotModified(status: number) {
+    return status === 200 || status === 304;
+  }
+
+  /**
+   * load all components of a step. Large steps are streamed by the server, the body is read
+   * chunk by chunk into a single buffer instead of being buffered by Axios and copied.
+   * 
+   * @param samples optional range [start, stop) of the samples to load, all samples are loaded by default
+   * @param max_points optional maximum number of vertices per sample, larger samples are decimated by the server
+   * @param precision optional transport precision of vertices and features, float32 by default
+   * @param signal optional signal to abort the request, see `cancelSource`
+   */
+  static async getData(run: string, tag: string, step: number, meta_data: StepMetadata, samples?: [number, number], max_points?: number, precision?: TransportPrecision, signal?: AbortSignal): Promise<DataResponse> {
+    const wall_time = Math.max(...Object.keys(meta_data)
+      .filter(key => key !== 'first_wall_time')
+      .map(key => meta_data[key].wall_time));
+    const sample = samples ? `&sample=${samples[0]}:${samples[1]}` : '';
+    const lod = max_points ? `&max_points=${max_points}` : '';
+    const encoding = precision && precision !== 'float32' ? `&precision=${precision}` : '';
+    const response = await fetch(`./step?tag=${tag}&run=${run}&step=${step}${sample}${lod}${encoding}&timestamp=${wall_time}`, { signal });
+    if (!response.ok) {
+      throw Error(`Loading step ${step} failed with status ${response.status}.`);
     }
-    if (meta_data.FEAT_COLORS) {
-      resp['feat_colors'] = await ApiService.getFeatColors(run, tag, step, meta_data.FEAT_COLORS.wall_time);
+
+    return ApiService.parseStep(await ApiService._readBody(response));
+  }
+
+  /**
+   * read a response body chunk by chunk. The buffer is allocated once if the length of the
+   * body is known, i.e. it was not compressed.
+   */
+  private static async _readBody(response: Response): Promise<ArrayBuffer> {
+    if (!response.body) {
+      return await response.arrayBuffer();
     }
-    if (meta_data.FACES) {
-      resp['faces'] = await ApiService.getFaces(run, tag, step, meta_data.FACES.wall_time);
+
+    const content_length = response.headers.get('Content-Length');
+    const length = content_length && !response.headers.get('Content-Encoding') ? parseInt(content_length, 10) : NaN;
+    const reader = response.body.getReader();
+    if (!isNaN(length)) {
+      const data = new Uint8Array(length);
+      let offset = 0;
+      for (let result = await reader.read(); !result.done; result = await reader.read()) {
+        data.set(result.value as Uint8Array, offset);
+        offset += result.value.byteLength;
+      }
+      return data.buffer;
     }
-    if (meta_data.FACE_COLORS) {
-      resp['face_colors'] = await ApiService.getFaceColors(run, tag, step, meta_data.FACE_COLORS.wall_time);
+
+    const chunks: Uint8Array[] = [];
+    let total = 0;
+    for (let result = await reader.read(); !result.done; result = await reader.read()) {
+      chunks.push(result.value as Uint8Array);
+      total += result.value.byteLength;
     }
-    return resp;
-  }
-  
-  static async getVertices(run: string, tag: string, step: number, wall_time: number) {
-    const buffer = await Axios.get(`./data?tag=${tag}&run=${run}&step=${step}&content_type=VERTICES&timestamp=${wall_time}`, {
-      responseType: 'arraybuffer'
+    const data = new Uint8Array(total);
+    let offset = 0;
+    chunks.forEach(chunk => {
+      data.set(chunk, offset);
+      offset += chunk.byteLength;
     });
-
-    return new Float32Array(buffer.data as ArrayBuffer);
+    return data.buffer;
   }
 
-  static async getVertColors(run: string, tag: string, step: number, wall_time: number) {
-    const buffer = await Axios.get(`./data?tag=${tag}&run=${run}&step=${step}&content_type=VERT_COLORS&timestamp=${wall_time}`, {
-      responseType: 'arraybuffer'
-    });
+  static cancelSource(): AbortController {
+    return new AbortController();
+  }
 
-    return new Uint8Array(buffer.data as ArrayBuffer);
+  /**
+   * whether a request failed because it was cancelled
+   */
+  static isCancel(err: any): boolean {
+    return err?.name === 'AbortError';
   }
 
-  static async getFeatures(run: string, tag: string, step: number, wall_time: number) {
-    const buffer = await Axios.get(`./data?tag=${tag}&run=${run}&step=${step}&content_type=FEATURES&timestamp=${wall_time}`, {
-      responseType: 'arraybuffer'
-    });
+  /**
+   * split a framed step payload into the typed arrays of its components
+   * 
+   * layout: header length (uint32) | JSON header | component data
+   */
+  static parseStep(buffer: ArrayBuffer): DataResponse {
+    const header_length = new DataView(buffer).getUint32(0, true);
+    const header: StepHeader = JSON.parse(
+      new TextDecoder().decode(new Uint8Array(buffer, 4, header_length)));
+    const data_offset = 4 + header_length;
 
-    return new Float32Array(buffer.data as ArrayBuffer);
-  }
+    const resp: DataResponse = { shapes: {} };
+    header.components.forEach(component => {
+      (resp.shapes as DataShapes)[component.name] = component.shape;
+      const array_type = ARRAY_TYPES[component.dtype];
+      const array = new array_type(
+        buffer,
+        data_offset + component.offset,
+        component.length / array_type.BYTES_PER_ELEMENT);
 
-  static async getFeatColors(run: string, tag: string, step: number, wall_time: number) {
-    const buffer = await Axios.get(`./data?tag=${tag}&run=${run}&step=${step}&content_type=FEAT_COLORS&timestamp=${wall_time}`, {
-      responseType: 'arraybuffer'
+      if (component.dtype === 'float16') {
+        resp[component.name] = ApiService.decodeFloat16(array as Uint16Array) as any;
+      } else if (component.dtype === 'uint16') {
+        resp[component.name] = ApiService.dequantize(array as Uint16Array, component.bounds as number[][]) as any;
+      } else {
+        resp[component.name] = array as any;
+      }
     });
-
-    return new Uint8Array(buffer.data as ArrayBuffer);
+    return resp;
   }
 
-  static async getFaces(run: string, tag: string, step: number, wall_time: number) {
-    const buffer = await Axios.get(`./data?tag=${tag}&run=${run}&step=${step}&content_type=FACES&timestamp=${wall_time}`, {
-      responseType: 'arraybuffer'
-    });
+  /**
+   * convert IEEE 754 half precision floats to a Float32Array
+   */
+  static decodeFloat16(array: Uint16Array): Float32Array {
+    const result = new Float32Array(array.length);
+    for (let i = 0; i < array.length; i++) {
+      const sign = array[i] & 0x8000 ? -1 : 1;
+      const exponent = (array[i] >> 10) & 0x1f;
+      const fraction = array[i] & 0x03ff;
 
-    return new Uint32Array(buffer.data as ArrayBuffer);
+      if (exponent === 0) {
+        result[i] = sign * Math.pow(2, -14) * (fraction / 1024);
+      } else if (exponent === 0x1f) {
+        result[i] = fraction ? NaN : sign * Infinity;
+      } else {
+        result[i] = sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+      }
+    }
+    return result;
   }
 
-  static async getFaceColors(run: string, tag: string, step: number, wall_time: number) {
-    const buffer = await Axios.get(`./data?tag=${tag}&run=${run}&step=${step}&content_type=FACE_COLORS&timestamp=${wall_time}`, {
-      responseType: 'arraybuffer'
-    });
-
-    return new Uint8Array(buffer.data as ArrayBuffer);
+  /**
+   * map uint16 values quantized per axis between bounds [[min_x, min_y, min_z], [max_x, max_y, max_z]] back to floats
+   */
+  static dequantize(array: Uint16Array, bounds: number[][]): Float32Array {
+    const [lower, upper] = bounds;
+    const dims = lower.length;
+    const scale = lower.map((min, axis) => (upper[axis] - min) / 65535);
+    const result = new Float32Array(array.length);
+    for (let i = 0; i < array.length; i++) {
+      const axis = i % dims;
+      result[i] = lower[axis] + array[i] * scale[axis];
+    }
+    return result;
   }
 }
@@ -1,9 +1,13 @@
 import { DataProvider } from "./data-provider";
+import { loader } from "./loader";
+import { StepNotification } from "./models/responses";
 import { StepData } from "./models/step";
 
 class DataManagerClass {
   providers: { [run: string]: { [tag: string]: DataProvider } } = {};
   get_data_lock = Promise.resolve();
+  private _events: EventSource | undefined = undefined;
+  private _tags_reload: ReturnType<typeof setTimeout> | undefined = undefined;
 
   getProvider(run: string, tag: string) {
     if (typeof(run) !== 'string' || typeof(tag) !== 'string') {
@@ -23,6 +27,29 @@ class DataManagerClass {
     return this.providers[run][tag];
   }
 
+  /**
+   * update tags and providers whenever the server announces a new step
+   */
+  listenForSteps() {
+    if (this._events || typeof EventSource === 'undefined') {
+      return;
+    }
+
+    this._events = new EventSource('./events');
+    this._events.addEventListener('step', (event: MessageEvent) => {
+      const notification: StepNotification = JSON.parse(event.data);
+
+      // new runs and tags of a burst of notifications are loaded at once
+      if (!loader.getRun(notification.run)?.tags[notification.tag] && !this._tags_reload) {
+        this._tags_reload = setTimeout(() => {
+          this._tags_reload = undefined;
+          loader.reload();
+        }, 100);
+      }
+      this.providers[notification.run]?.[notification.tag]?.updateMetaData();
+    });
+  }
+
   async updateProviders() {
     Object.keys(this.providers).forEach(run => {
       Object.values(this.providers[run]).forEach(provider => {
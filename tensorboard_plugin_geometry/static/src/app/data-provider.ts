@@ -1,10 +1,12 @@
 import { ApiService } from "./api";
-import { ThreeConfig } from "./models/metadata";
+import { SampleStats, ThreeConfig } from "./models/metadata";
 import { CONTENT_TYPES } from "./models/content-types";
-import { StepData, Steps } from "./models/step";
+import { RawStep, StepData, Steps } from "./models/step";
 import { ThreeFactory } from "./three-factory";
 import { Observeable } from "./models/observeable";
 import { Settings } from "./settings";
+import { StepCache } from "./step-cache";
+import { DataResponse } from "./models/responses";
 
 export class DataProvider {
 
@@ -14,8 +16,21 @@ export class DataProvider {
   steps_data: (StepData | undefined)[] = [];
   norm_steps_data: (StepData | undefined)[] = [];
   current_step_id = -1;
+  // range [start, stop) of the visible samples, undefined if all samples are visible
+  samples: [number, number] | undefined = undefined;
+  // metadata of all loaded steps and the token of their last changes
+  private _raw_steps: RawStep[] = [];
+  private _metadata_token = '';
+  // requests of steps that are being loaded, by cache key
+  private _loading: { [key: string]: { step: number, promise: Promise<DataResponse>, cancel: Function } } = {};
   
-  constructor() {}
+  constructor() {
+    // steps were loaded with another resolution
+    Settings.full_resolution.subscribe(() => {
+      this.steps_data = [];
+      this.norm_steps_data = [];
+    });
+  }
 
   async init(run: string, tag: string) {
     this.run = run;
@@ -24,10 +39,20 @@ export class DataProvider {
   }
 
   async updateMetaData() {
-    const res = await ApiService.getMetadata(this.run, this.tag);
+    const changes = await ApiService.getMetadataChanges(this.run, this.tag, this._metadata_token);
+    if (!changes) {
+      return;
+    }
+
+    // replace the entries of changed steps
+    const replaced = new Set([...changes.removed, ...changes.changed.map(step => step.step)]);
+    this._raw_steps = (changes.reset ? [] : this._raw_steps.filter(step => !replaced.has(step.step)))
+      .concat(changes.changed);
+    this._metadata_token = changes.token;
+
     // save steps
     const steps: Steps = { steps: {}, step_ids: [] };
-    res.data.forEach(step => {
+    this._raw_steps.forEach(step => {
       if (!steps.config && typeof step.config == 'string') {
         steps.config = JSON.parse(step.config);
       } else if (!steps.config && typeof step.config == 'object') {
@@ -50,6 +75,7 @@ export class DataProvider {
 
       steps.steps[step.step][CONTENT_TYPES[step.content_type]].shape = step.data_shape;
       steps.steps[step.step][CONTENT_TYPES[step.content_type]].wall_time = step.wall_time;
+      steps.steps[step.step][CONTENT_TYPES[step.content_type]].stats = step.stats;
     });
       
     steps.step_ids = Object.keys(steps.steps).map(val => parseInt(val)).sort((a, b) => a - b);
@@ -68,48 +94,89 @@ export class DataProvider {
     }
   }
 
-  async getData(id: undefined | number = undefined, isBufferCall = false): Promise<StepData | undefined> {
-    if (!id) {
+  /**
+   * only load the given range of samples of each step from now on
+   */
+  setSamples(samples: [number, number] | undefined) {
+    if (samples?.[0] === this.samples?.[0] && samples?.[1] === this.samples?.[1]) {
+      return;
+    }
+
+    this.samples = samples;
+    this.steps_data = [];
+    this.norm_steps_data = [];
+  }
+
+  /**
+   * get the geometries of a step, the current one by default
+   *
+   * Neighboring steps are loaded in the background and requests of steps the user
+   * jumped away from are cancelled. Decoded steps are kept in the `StepCache`.
+   *
+   * @returns the step data or undefined if the request was cancelled
+   */
+  async getData(id: undefined | number = undefined): Promise<StepData | undefined> {
+    if (id === undefined) {
       id = this.steps_metadata.value.step_ids[this.current_step_id];
     }
     const normalize = Settings.norm_features.value;
     const this_data = Settings.norm_features.value ? this.norm_steps_data : this.steps_data;
-    const last_step_id = this.steps_metadata.value.step_ids.length - 1;
 
-    // buffer geo
-    if (this.current_step_id > 0 && !isBufferCall) {
-      this.getData(this.steps_metadata.value.step_ids[this.current_step_id - 1], true);
-    }
-    if (this.current_step_id < last_step_id && !isBufferCall) {
-      this.getData(this.steps_metadata.value.step_ids[this.current_step_id + 1], true);
-    }
-    if (this.current_step_id > 9 && !isBufferCall) {
-      delete this_data[this.current_step_id - 10];
-    }
-    if (this.current_step_id < last_step_id - 10 && !isBufferCall) {
-      delete this_data[this.current_step_id + 10];
-    }
+    const neighbors = this._neighborSteps();
+    Object.keys(this._loading)
+      .filter(key => !neighbors.includes(this._loading[key].step))
+      .forEach(key => {
+        this._loading[key].cancel();
+        delete this._loading[key];
+      });
+    neighbors
+      .filter(step => step !== id)
+      .forEach(step => this._loadStep(step).catch(() => undefined));
+    // geometries are only kept for neighbors, others are created from the cache again
+    Object.keys(this_data)
+      .map(val => parseInt(val))
+      .filter(step => step !== id && !neighbors.includes(step))
+      .forEach(step => delete this_data[step]);
     
     if (!this_data[id] && id >= 0) {
-      const data = await ApiService.getData(this.run, this.tag, id, this.steps_metadata.value.steps[id]);
+      let data: DataResponse;
+      try {
+        data = await this._loadStep(id);
+      } catch (err) {
+        if (ApiService.isCancel(err)) {
+          return undefined;
+        }
+        throw err;
+      }
+      const shapes = data.shapes || {};
 
       if (!data.vertices || !this.steps_metadata.value.steps[id].VERTICES) {
         throw Error(`No vertices available for run ${this.run}, tag ${this.tag}, and step ${id}.`);
       }
       
+      const vert_stats = this._visibleStats(id, 'VERTICES');
+      const feat_stats = this._visibleStats(id, 'FEATURES');
       const resp: StepData = {
         raw_data: data,
         broken: true
       };
+      // normalized geometries are scaled, so their bounds are only known once created
+      const finite_stats = vert_stats?.filter(stats => stats.min.indexOf(null) < 0 && stats.max.indexOf(null) < 0);
+      if (finite_stats && finite_stats.length > 0 && !normalize) {
+        resp.bounds = [
+          [0, 1, 2].map(axis => Math.min(...finite_stats.map(stats => stats.min[axis] as number))),
+          [0, 1, 2].map(axis => Math.max(...finite_stats.map(stats => stats.max[axis] as number))),
+        ];
+      }
       
       this_data[id] = resp;
 
       const geo = ThreeFactory.createGeometry(
-        this.steps_metadata.value.steps[id].VERTICES?.shape,
+        shapes.vertices || this.steps_metadata.value.steps[id].VERTICES?.shape,
         data.vertices,
-        this.steps_metadata.value.steps[id].FACES?.shape,
+        shapes.faces || this.steps_metadata.value.steps[id].FACES?.shape,
         data.faces,
-        this.steps_metadata.value.steps[id].FACE_COLORS?.shape,
+        shapes.face_colors || this.steps_metadata.value.steps[id].FACE_COLORS?.shape,
         data.face_colors,
         data.vert_colors,
         this.steps_metadata.value.config,
@@ -119,12 +186,13 @@ export class DataProvider {
 
       if (!!data.features) {
         const feats = ThreeFactory.createFeatureArrows(
-          this.steps_metadata.value.steps[id].VERTICES?.shape,
+          shapes.vertices || this.steps_metadata.value.steps[id].VERTICES?.shape,
           data.vertices,
           data.features,
           data.feat_colors,
           this.steps_metadata.value.config,
-          normalize);
+          normalize,
+          feat_stats ? Math.max(...feat_stats.map(stats => stats.norm_max || 0)) : undefined);
         resp['features'] = feats?.features;
         resp['max_magnitude'] = feats?.max_magnitude;
       }
@@ -137,6 +205,59 @@ export class DataProvider {
     return this_data[id];
   }
 
+  /**
+   * statistics of the visible samples of a component of a step, undefined if the server sent none
+   */
+  private _visibleStats(step: number, content_type: 'VERTICES' | 'FEATURES'): SampleStats[] | undefined {
+    const stats = this.steps_metadata.value.steps[step]?.[content_type]?.stats;
+    if (!stats || stats.length === 0) {
+      return undefined;
+    }
+    const visible = this.samples ? stats.slice(this.samples[0], this.samples[1]) : stats;
+    return visible.length > 0 ? visible : undefined;
+  }
+
+  /**
+   * steps within `Settings.prefetch_steps` of the current step
+   */
+  private _neighborSteps(): number[] {
+    const step_ids = this.steps_metadata.value.step_ids;
+    const start = Math.max(0, this.current_step_id - Settings.prefetch_steps);
+    return step_ids.slice(start, this.current_step_id + Settings.prefetch_steps + 1);
+  }
+
+  /**
+   * get the decoded components of a step from the cache or load them
+   */
+  private _loadStep(step: number): Promise<DataResponse> {
+    const max_points = Settings.full_resolution.value ? undefined : Settings.max_points;
+    const metadata = this.steps_metadata.value.steps[step];
+    const key = JSON.stringify([this.run, this.tag, step, this.samples, max_points, Settings.transport_precision, metadata]);
+
+    const cached = StepCache.get(key);
+    if (cached) {
+      return Promise.resolve(cached);
+    }
+
+    if (!this._loading[key]) {
+      const source = ApiService.cancelSource();
+      const promise = ApiService.getData(this.run, this.tag, step, metadata, this.samples, max_points, Settings.transport_precision, source.signal);
+      const loading = { step, promise, cancel: () => source.abort() };
+      this._loading[key] = loading;
+
+      const done = () => {
+        if (this._loading[key] === loading) {
+          delete this._loading[key];
+        }
+      };
+      promise.then(data => {
+        StepCache.set(key, data);
+        done();
+      }, done);
+    }
+    return this._loading[key].promise;
+  }
+
   getConfigById(id: number): ThreeConfig {
     return this.steps_metadata[id]?.config;
   }
@@ -48,6 +48,9 @@ export default class DataRunComponent extends Vue {
     loading: true,
     current_step_id: -1,
     current_step_label: 0,
+    // index of the visible sample of the batch, -1 if all samples are visible
+    sample: -1,
+    n_samples: 1,
     current_wall_time: new Date(),
     max_step: 0,
     plot_height: (this.$el as HTMLElement)?.offsetWidth + 'px',
@@ -65,6 +68,9 @@ export default class DataRunComponent extends Vue {
     Settings.norm_features.subscribe(() => {
       this.updatePlotData();
     });
+    Settings.full_resolution.subscribe(() => {
+      this.updatePlotData();
+    });
   }
 
   // vue event
@@ -97,8 +103,29 @@ export default class DataRunComponent extends Vue {
     this.updatePlotData();
   }
 
+  /**
+   * show only one sample of the batch or all samples (-1), only the visible samples are loaded
+   */
+  updateSample(new_value: number) {
+    if (new_value < -1 || new_value >= this.data.n_samples) {
+      return;
+    }
+
+    this.data.sample = new_value;
+    this.provider?.setSamples(new_value < 0 ? undefined : [new_value, new_value + 1]);
+    this.updatePlotData();
+  }
+
   updateStep(new_value: number) {
     this.data.current_step_label = this.steps.step_ids[new_value];
+
+    const n_samples = this.steps.steps[this.data.current_step_label]?.VERTICES?.shape[0] || 1;
+    if (n_samples !== this.data.n_samples) {
+      this.data.n_samples = n_samples;
+      this.data.sample = n_samples > Settings.max_samples ? 0 : -1;
+    }
+    this.data.sample = Math.min(this.data.sample, n_samples - 1);
+    this.provider?.setSamples(this.data.sample < 0 ? undefined : [this.data.sample, this.data.sample + 1]);
     
     // if current label is in steps (important for step-up)
     if (Object.keys(this.steps.steps)
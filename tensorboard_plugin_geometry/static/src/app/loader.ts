@@ -1,6 +1,5 @@
 import { ApiService } from "./api";
 import { Observeable } from "./models/observeable";
-import { TagsResponse } from "./models/responses";
 import { RawRuns, Run } from "./models/run";
 import { TagCard } from "./models/tag";
 import { URLParser } from "./url-parser";
@@ -30,8 +29,10 @@ export class LoaderClass {
   regexInput = new Observeable<string>('');
   tagFilter = new Observeable<string>('');
 
-  // raw data buffer to check if there are changes
+  // raw data buffer the changes are applied to
   _tags_data: RawRuns = {};
+  // token of the last tag changes
+  private _tags_token = '';
 
   get runs() {
     return this._runCollection.runs;
@@ -102,10 +103,25 @@ export class LoaderClass {
   }
 
   async reload() {
-    const tags: TagsResponse = await ApiService.getTags();
+    const changes = await ApiService.getTagChanges(this._tags_token);
+
+    if (changes) {
+      const tags_data: RawRuns = changes.reset ? {} : { ...this._tags_data };
+      Object.keys(changes.removed).forEach(run => {
+        const removed = changes.removed[run];
+        if (removed === null) {
+          delete tags_data[run];
+        } else if (tags_data[run]) {
+          tags_data[run] = { ...tags_data[run] };
+          removed.forEach(tag => delete tags_data[run][tag]);
+        }
+      });
+      Object.keys(changes.changed).forEach(run => {
+        tags_data[run] = { ...tags_data[run], ...changes.changed[run] };
+      });
 
-    if(this._tags_data !== tags.data){
-      this._tags_data = tags.data;
+      this._tags_token = changes.token;
+      this._tags_data = tags_data;
       this._runCollection.updateRuns(this._tags_data);
 
       this.tags.next(this._runCollection.tags);
@@ -1,6 +1,17 @@
 export interface Metadata {
   shape: number[];
   wall_time: number;
+  stats?: SampleStats[];
+}
+
+// statistics of a sample of vertices or features, computed by the server,
+// null where the sample has no finite values
+export interface SampleStats {
+  min: (number | null)[];
+  max: (number | null)[];
+  centroid?: (number | null)[]; // vertices only
+  norm_min?: number | null; // features only
+  norm_max?: number | null;
 }
 
 export interface ThreeConfig {
@@ -9,6 +9,31 @@ export interface MetadataResponse {
   data: RawStep[];
 }
 
+// runs and tags changed since the token of an earlier response
+export interface TagChanges {
+  token: string;
+  reset: boolean; // all runs are sent, earlier ones must be discarded
+  changed: RawRuns;
+  removed: { [run: string]: string[] | null }; // null if the run was removed
+}
+
+// `step` event of the `/events` stream, sent when a new step was loaded
+export interface StepNotification {
+  run: string;
+  tag: string;
+  step: number;
+  wall_time: number;
+  components: number[]; // content types
+}
+
+// steps changed since the token of an earlier response
+export interface MetadataChanges {
+  token: string;
+  reset: boolean; // all steps are sent, earlier ones must be discarded
+  changed: RawStep[];
+  removed: number[];
+}
+
 export interface DataResponse {
   vertices?: Float32Array;
   vert_colors?: Uint8Array;
@@ -16,5 +41,27 @@ export interface DataResponse {
   feat_colors?: Uint8Array;
   faces?: Uint32Array;
   face_colors?: Uint8Array;
+  shapes?: DataShapes; // shapes of the loaded samples
 }
 
+export type DataShapes = {
+  [name in ComponentName]?: number[];
+};
+
+export type ComponentName = Exclude<keyof DataResponse, 'shapes'>;
+
+export type TransportPrecision = 'float32' | 'float16' | 'uint16';
+
+export interface StepComponent {
+  name: ComponentName;
+  dtype: 'float32' | 'int32' | 'uint8' | 'float16' | 'uint16';
+  shape: number[];
+  offset: number;
+  length: number;
+  // per axis [min, max] of uint16 quantized components
+  bounds?: number[][];
+}
+
+export interface StepHeader {
+  components: StepComponent[];
+}
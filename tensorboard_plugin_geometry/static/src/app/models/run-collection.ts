@@ -82,6 +82,7 @@ export class RunCollection {
         name: tag,
         description: this._parseMarkdown(tags[tag].description),
         samples: tags[tag].samples,
+        steps: tags[tag].steps,
       };
 
       tagCollection[newTag.name] = newTag;
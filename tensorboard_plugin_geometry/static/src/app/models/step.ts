@@ -1,5 +1,5 @@
 import { Group, OrthographicCamera, PerspectiveCamera, Points } from "three";
-import { Metadata, ThreeConfig } from "./metadata";
+import { Metadata, SampleStats, ThreeConfig } from "./metadata";
 import { DataResponse } from "./responses";
 
 export interface StepMetadata {
@@ -18,6 +18,7 @@ export interface StepData {
   broken?: boolean;
   not_initialized?: boolean;
   max_magnitude?: number;
+  bounds?: number[][]; // [min, max] of the vertices, known before they are loaded
   raw_data?: DataResponse;
 }
 
@@ -29,6 +30,7 @@ export interface RawStep {
   config: string;
   data_shape: number[];
   description: string;
+  stats?: SampleStats[]; // vertices and features only
 }
 
 export interface Steps {
@@ -5,6 +5,12 @@ export interface RawTagCollection {
 export interface RawTag {
   samples: number;
   description: string;
+  steps: StepCounts;
+}
+
+export interface StepCounts {
+  kept: number;
+  written: number | null; // null if TensorBoard samples the steps
 }
 
 export interface TagCollection {
@@ -15,6 +21,7 @@ export interface Tag {
   name: string;
   description: string;
   samples: number;
+  steps: StepCounts;
 }
 
 export interface TagCard {
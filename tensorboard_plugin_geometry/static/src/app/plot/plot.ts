@@ -54,6 +54,8 @@ export default class PlotComponent extends Vue {
   lut_plane: Sprite | undefined;
   show_lut = false;
   max_mag = 1.0;
+  // bounds of the vertices from the step's stats, the scene is traversed without them
+  bounds: number[][] | undefined;
   is_active = false;
 
   mounted() {
@@ -156,6 +158,7 @@ export default class PlotComponent extends Vue {
     this.geometries = [];
     
     this.update();
+    this.bounds = data.bounds;
     if (data.broken || data.not_initialized) {
       this.refresh();
       return;
@@ -407,6 +410,10 @@ export default class PlotComponent extends Vue {
   }
 
   private _getBoundingBox() {
+    if (this.bounds) {
+      return new Box3(new Vector3().fromArray(this.bounds[0]), new Vector3().fromArray(this.bounds[1]));
+    }
+
     const bounds = new Box3();
     this.scene.updateWorldMatrix(false, true);
     
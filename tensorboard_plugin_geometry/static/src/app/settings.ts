@@ -1,4 +1,5 @@
 import { Observeable } from "./models/observeable";
+import { TransportPrecision } from "./models/responses";
 
 class SettingsClass {
   point_size = new Observeable<number>(5);
@@ -9,6 +10,21 @@ class SettingsClass {
   show_vertices = new Observeable<boolean>(true);
   show_wireframe = new Observeable<boolean>(false);
   norm_features = new Observeable<boolean>(true);
+
+  // larger geometries are decimated on the server unless full resolution is requested
+  max_points = 1000000;
+  full_resolution = new Observeable<boolean>(false);
+
+  // float16 and uint16 halve the transfer size of vertices and features at the cost of precision
+  transport_precision: TransportPrecision = 'float32';
+
+  // decoded steps of all runs and tags are cached up to this many megabytes
+  cache_budget_mb = new Observeable<number>(512);
+  // number of steps before and after the current one that are loaded in the background
+  prefetch_steps = 2;
+
+  // batches with more samples show only one sample at a time by default
+  max_samples = 8;
 }
 
 export const Settings = new SettingsClass();
\ No newline at end of file
@@ -34,6 +34,7 @@ export default class SidebarComponent extends Vue {
     show_wireframe: true,
     show_features: true,
     norm_features: true,
+    full_resolution: false,
   }
 
   mounted() {
@@ -51,6 +52,7 @@ export default class SidebarComponent extends Vue {
       }
     });
 
+    DataManager.listenForSteps();
     loader.reloadContainer.isReloading$.subscribe(async (loading) => {
       if (loading) {
         await DataManager.updateProviders();
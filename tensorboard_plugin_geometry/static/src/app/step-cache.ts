@@ -0,0 +1,69 @@
+import { DataResponse } from "./models/responses";
+import { Settings } from "./settings";
+
+/**
+ * byte bounded LRU cache of the decoded components of steps, shared by all data providers
+ */
+class StepCacheClass {
+  max_size = 0;
+  size = 0;
+  // insertion order of a Map is the order of use, least recently used first
+  private _entries = new Map<string, { data: DataResponse, size: number }>();
+
+  constructor() {
+    Settings.cache_budget_mb.subscribe((budget: number) => {
+      this.max_size = budget * 1024 * 1024;
+      this._evict();
+    });
+  }
+
+  get(key: string): DataResponse | undefined {
+    const entry = this._entries.get(key);
+    if (!entry) {
+      return undefined;
+    }
+    this._entries.delete(key);
+    this._entries.set(key, entry);
+    return entry.data;
+  }
+
+  set(key: string, data: DataResponse) {
+    const size = StepCacheClass.byteSize(data);
+    if (size > this.max_size) {
+      return;
+    }
+
+    this.delete(key);
+    this._entries.set(key, { data, size });
+    this.size += size;
+    this._evict();
+  }
+
+  delete(key: string) {
+    const entry = this._entries.get(key);
+    if (entry) {
+      this._entries.delete(key);
+      this.size -= entry.size;
+    }
+  }
+
+  /**
+   * number of bytes of the typed arrays of a step
+   */
+  static byteSize(data: DataResponse): number {
+    return Object.keys(data)
+      .filter(name => name !== 'shapes' && !!data[name])
+      .reduce((size, name) => size + (data[name] as ArrayBufferView).byteLength, 0);
+  }
+
+  private _evict() {
+    this._entries.forEach((entry, key) => {
+      if (this.size > this.max_size) {
+        this._entries.delete(key);
+        this.size -= entry.size;
+      }
+    });
+  }
+}
+
+export const StepCache = new StepCacheClass();
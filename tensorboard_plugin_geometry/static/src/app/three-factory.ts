@@ -169,6 +169,7 @@ export class ThreeFactory {
     feat_colors?: Uint8Array,
     config?: ThreeConfig,
     normalized = false,
+    max_magnitude?: number, // maximum feature length, if known from the step's stats
   ): {'features': Group, 'max_magnitude': number} | undefined {
 
     if (!vertices_shape || vertices_shape.length == 0 || !vertices_arr || vertices_arr.length == 0) {
@@ -221,15 +222,17 @@ export class ThreeFactory {
     const vertices = geo.getAttribute('position').array;
 
     // get max vector length
-    let max_len = 0;
-    for (let i = 0; i < vertices_shape[0]; i++) {
-      for (let j = 0; j < vertices_shape[1]; j++) {
-        const direction = new Vector3(
-          features_arr[i * vertices_shape[1] + j * 3],
-          features_arr[i * vertices_shape[1] + j * 3 + 1],
-          features_arr[i * vertices_shape[1] + j * 3 + 2]
-        );
-        max_len = Math.max(max_len, direction.length());
+    let max_len = max_magnitude || 0;
+    if (max_magnitude === undefined) {
+      for (let i = 0; i < vertices_shape[0]; i++) {
+        for (let j = 0; j < vertices_shape[1]; j++) {
+          const direction = new Vector3(
+            features_arr[i * vertices_shape[1] + j * 3],
+            features_arr[i * vertices_shape[1] + j * 3 + 1],
+            features_arr[i * vertices_shape[1] + j * 3 + 2]
+          );
+          max_len = Math.max(max_len, direction.length());
+        }
       }
     }
 
@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+# Directory of the built frontend.
+BUNDLE_DIR = os.path.join(os.path.dirname(__file__), 'static', 'bundle')
+
+# Content types of the bundle's files that mimetypes does not know or
+# guesses differently on some platforms.
+_CONTENT_TYPES = {
+  '.js': 'application/javascript',
+  '.css': 'text/css',
+  '.svg': 'image/svg+xml',
+  '.eot': 'application/vnd.ms-fontobject',
+  '.ttf': 'font/ttf',
+  '.woff': 'font/woff',
+  '.woff2': 'font/woff2',
+}
+
+# Formats that are compressed already.
+_COMPRESSED_FORMATS = {'.woff', '.woff2', '.png', '.jpg', '.gif'}
+
+class StaticFile():
+  """A file of the bundle with its compressed variants."""
+
+  def __init__(self, content, content_type, etag, variants):
+    """
+    Args:
+      content: bytes of the file.
+      content_type: MIME type of the file.
+      etag: hash of the content.
+      variants: dict mapping content encodings to the compressed content,
+        only for encodings that make the file smaller.
+    """
+    self.content = content
+    self.content_type = content_type
+    self.etag = etag
+    self.variants = variants
+
+class StaticFiles():
+  """Reads the files of the frontend bundle on first use and keeps them in
+  memory, together with gzip and, if the brotli module is installed, brotli
+  compressed variants."""
+
+  def __init__(self, directory=BUNDLE_DIR):
+    self._directory = directory
+    # path -> StaticFile of the files that exist, missing files are not
+    # kept, as clients may request any path
+    self._files = {}
+    # transforms may get other files
+    self._lock = threading.RLock()
+
+  def get(self, path, transform=None):
+    """Gets a file of the bundle.
+    Args:
+      path: path of the file relative to the bundle directory.
+      transform: optional callable changing the content of the file when it
+        is read.
+    Returns:
+      StaticFile or None, if the file does not exist.
+    """
+    with self._lock:
+      if path not in self._files:
+        static_file = self._read(path, transform)
+        if static_file is None:
+          return None
+        self._files[path] = static_file
+      return self._files[path]
+
+  def list(self, directory):
+    """Lists the names of the files in a directory of the bundle."""
+    try:
+      return sorted(os.listdir(os.path.join(self._directory, directory)))
+    except OSError:
+      return []
+
+  def _read(self, path, transform):
+    """Reads a file and compresses it."""
+    try:
+      with open(os.path.join(self._directory, path), 'rb') as f:
+        content = f.read()
+    except OSError:
+      return None
+    if transform is not None:
+      content = transform(content)
+
+    extension = os.path.splitext(path)[1].lower()
+    content_type = _CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    variants = {}
+    if extension not in _COMPRESSED_FORMATS:
+      variants['gzip'] = gzip.compress(content, 9)
+      if brotli is not None:
+        variants['br'] = brotli.compress(content)
+    variants = {
+      encoding: data for encoding, data in variants.items() if len(data) < len(content)
+    }
+
+    return StaticFile(content, content_type, hashlib.sha1(content).hexdigest()[:20], variants)
@@ -0,0 +1,66 @@
+import numpy as np
+import six
+
+from .plugin_data_pb2 import GeoPluginData
+
+# Components with per-sample statistics.
+COMPONENTS = [GeoPluginData.VERTICES, GeoPluginData.FEATURES]
+
+def get_sample_stats(array, content_type):
+  """Computes statistics of each sample of a component, which clients need
+  before the data is loaded, e.g. to frame the camera or scale colormaps.
+  Args:
+    array: numpy array of shape [B, N, 3].
+    content_type: GeoPluginData.ContentType in COMPONENTS.
+  Returns:
+    List of B dicts with the axis aligned bounding box `min` and `max`,
+    for vertices their `centroid` and for features the range `norm_min`,
+    `norm_max` of their magnitudes. Points with NaN or infinite values are
+    left out, values without any finite point are None.
+  """
+  stats = _reduce(array, content_type)
+  if not all(_is_finite(sample) for sample in stats):
+    # Only arrays with non-finite values pay for masking them.
+    finite = np.isfinite(array).all(axis=-1)
+    stats = [
+      _reduce(array[i][finite[i]][np.newaxis], content_type)[0] if not _is_finite(sample) else sample
+      for i, sample in enumerate(stats)
+    ]
+  return [
+    {key: _to_json(value) for key, value in six.iteritems(sample)} for sample in stats
+  ]
+
+def _reduce(array, content_type):
+  """Computes the statistics of each sample as numpy values."""
+  n_samples, n_points = array.shape[:2]
+  if n_points == 0:
+    nans = np.full((n_samples, array.shape[-1]), np.nan)
+    lower, upper, centroid, norms = nans, nans, nans, np.full((n_samples, 1), np.nan)
+  else:
+    # Reductions along the last, contiguous axis are several times faster.
+    axes = np.ascontiguousarray(array.transpose(0, 2, 1))
+    lower, upper = axes.min(axis=2), axes.max(axis=2)
+    if content_type == GeoPluginData.VERTICES:
+      centroid = axes.sum(axis=2, dtype=np.float64) / n_points
+    else:
+      norms = np.sqrt(np.einsum('bnk,bnk->bn', array, array))
+
+  stats = [{"min": lower[i], "max": upper[i]} for i in range(n_samples)]
+  for i, sample in enumerate(stats):
+    if content_type == GeoPluginData.VERTICES:
+      sample["centroid"] = centroid[i]
+    else:
+      sample["norm_min"] = norms[i].min()
+      sample["norm_max"] = norms[i].max()
+  return stats
+
+def _is_finite(sample):
+  """Whether all statistics of a sample are finite."""
+  return all(np.isfinite(value).all() for value in sample.values())
+
+def _to_json(value):
+  """Converts numpy statistics to floats or lists of floats, None where they
+  are not finite, as JSON has no NaN or infinity."""
+  if np.ndim(value) > 0:
+    return [_to_json(item) for item in value]
+  return float(value) if np.isfinite(value) else None
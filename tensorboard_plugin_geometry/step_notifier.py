@@ -0,0 +1,117 @@
+import collections
+import threading
+
+# Seconds between checks for new steps.
+DEFAULT_INTERVAL = 2.0
+
+class StepNotifier():
+  """Notifies subscribers about geometry steps loaded by the multiplexer.
+
+  The multiplexer has no callback for new events, so a background thread
+  checks the indexed steps of all tags while there are subscribers. Each
+  new step is a notification with an increasing id, of which the most
+  recent ones are kept for clients that reconnect.
+  """
+
+  def __init__(self, tag_server, interval=DEFAULT_INTERVAL, max_notifications=1000):
+    """
+    Args:
+      tag_server: TagServer of the plugin.
+      interval: seconds between checks for new steps.
+      max_notifications: number of notifications kept for reconnecting
+        clients.
+    """
+    self._tag_server = tag_server
+    self._interval = interval
+    # (id, notification) of the most recent new steps
+    self._notifications = collections.deque(maxlen=max_notifications)
+    self._last_id = 0
+    # (run, tag) -> steps notified so far, None until the first check
+    self._known = None
+    # run -> generation of the tensor index at the last check
+    self._generations = {}
+    self._subscribers = 0
+    self._thread = None
+    self._condition = threading.Condition()
+
+  def subscribe(self, last_id=None):
+    """Starts checking for new steps for a subscriber.
+    Args:
+      last_id: id of the last notification the subscriber received, if it
+        reconnects.
+    Returns:
+      The id after which the subscriber gets notifications.
+    """
+    with self._condition:
+      self._subscribers += 1
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name='StepNotifier', daemon=True)
+        self._thread.start()
+      if last_id is None or last_id > self._last_id:
+        return self._last_id
+      return last_id
+
+  def unsubscribe(self):
+    """Stops checking once no subscribers are left."""
+    with self._condition:
+      self._subscribers -= 1
+      self._condition.notify_all()
+
+  def wait(self, after, timeout):
+    """Waits for notifications.
+    Args:
+      after: id of the last notification already received.
+      timeout: maximum number of seconds to wait.
+    Returns:
+      List of (id, notification) newer than after, empty on timeout.
+    """
+    with self._condition:
+      self._condition.wait_for(lambda: self._last_id > after, timeout)
+      return [(i, notification) for i, notification in self._notifications if i > after]
+
+  def check(self):
+    """Notifies about the steps indexed since the last check. Steps known at
+    the first check are not notified."""
+    tags = self._tag_server.get_tags_response()
+    index = self._tag_server.tensor_index
+    notifications = []
+    known = dict(self._known or {})
+
+    for run, run_tags in tags.items():
+      generation = index.generation(run)
+      if self._known is not None and self._generations.get(run) == generation:
+        continue
+      self._generations[run] = generation
+
+      for tag in run_tags:
+        steps = self._tag_server.get_steps(run, tag)
+        if self._known is not None:
+          notified = known.get((run, tag), set())
+          for step in sorted(set(steps) - notified):
+            wall_time, components = steps[step]
+            notifications.append({
+              "run": run, "tag": tag, "step": step, "wall_time": wall_time, "components": components,
+            })
+        known[(run, tag)] = set(steps)
+
+    with self._condition:
+      self._known = known
+      for notification in notifications:
+        self._last_id += 1
+        self._notifications.append((self._last_id, notification))
+      if notifications:
+        self._condition.notify_all()
+
+  def _run(self):
+    """Checks for new steps until no subscribers are left."""
+    while True:
+      try:
+        self.check()
+      except Exception: # the next check is retried
+        pass
+
+      with self._condition:
+        self._condition.wait_for(lambda: not self._subscribers, self._interval)
+        if not self._subscribers:
+          self._thread = None
+          return
@@ -1,14 +1,45 @@
-import torch
+import hashlib
+import json
+import sys
+import time
+import weakref
+import numpy as np
+from tensorboard.compat.proto.event_pb2 import Event
 from tensorboard.compat.proto.summary_pb2 import Summary
 from tensorboard.compat.proto.summary_pb2 import SummaryMetadata
 from tensorboard.compat.proto.tensor_pb2 import TensorProto
 from tensorboard.compat.proto.tensor_shape_pb2 import TensorShapeProto
-import json
 
 from . import metadata
+from . import sidecar
 from .plugin_data_pb2 import GeoPluginData
 
-tag_history = {}
+# file writer -> {instance tag: (digest, keyframe step, writes since the keyframe)}
+tag_history = weakref.WeakKeyDictionary()
+
+# writer passed to `use_sidecar_storage` -> (SidecarWriter, minimum size in
+# bytes of stored tensors)
+_sidecars = weakref.WeakKeyDictionary()
+
+# Order of the components in the arguments of add_geometry.
+_COMPONENTS = [
+  GeoPluginData.VERTICES,
+  GeoPluginData.VERT_COLORS,
+  GeoPluginData.FACES,
+  GeoPluginData.FACE_COLORS,
+  GeoPluginData.FEATURES,
+  GeoPluginData.FEAT_COLORS,
+]
+
+# Dtypes used to store each component as packed little endian `tensor_content`.
+_TENSOR_DTYPES = {
+  GeoPluginData.VERTICES: (np.dtype('<f4'), 'DT_FLOAT'),
+  GeoPluginData.FEATURES: (np.dtype('<f4'), 'DT_FLOAT'),
+  GeoPluginData.VERT_COLORS: (np.dtype('u1'), 'DT_UINT8'),
+  GeoPluginData.FEAT_COLORS: (np.dtype('u1'), 'DT_UINT8'),
+  GeoPluginData.FACE_COLORS: (np.dtype('u1'), 'DT_UINT8'),
+  GeoPluginData.FACES: (np.dtype('<i4'), 'DT_INT32'),
+}
 
 def add_geometry(
   writer,
@@ -22,7 +53,8 @@ def add_geometry(
   config_dict=None,
   global_step=None,
   walltime=None,
-  description=None):
+  description=None,
+  keyframe_interval=None):
   '''Add meshes or 3D point clouds to TensorBoard. The visualization is based on Three.js,
     so it allows users to interact with the rendered object. Besides the basic definitions
     such as vertices, faces, users can further provide camera parameter, lighting condition, etc.
@@ -30,19 +62,25 @@ def add_geometry(
     advanced usage.
     
     Args:
+        writer: `torch.utils.tensorboard.SummaryWriter`, a file writer with `add_summary` or
+          an event file writer with `add_event`.
         tag (string): Data identifier
-        vertices (torch.Tensor): List of the 3D coordinates of vertices.
-        vert_colors (torch.Tensor): List of colors from 0 to 255 for each vertex.
-        faces (torch.Tensor): Indices of vertices within each triangle. (Optional)
-        face_color (torch.Tensor): List of colors for each sample in range [0,255]. (Optional)
-        features (torch.Tensor): feature vectors for each vertex (Optional)
-        feat_colors (torch.Tensor): List of colors from 0 to 255 for each feature. (Optional)
+        vertices (array_like): List of the 3D coordinates of vertices. Components can be numpy
+          arrays, torch tensors or anything exposing `__array__` or the buffer protocol.
+        vert_colors (array_like): List of colors from 0 to 255 for each vertex.
+        faces (array_like): Indices of vertices within each triangle. (Optional)
+        face_color (array_like): List of colors for each sample in range [0,255]. (Optional)
+        features (array_like): feature vectors for each vertex (Optional)
+        feat_colors (array_like): List of colors from 0 to 255 for each feature. (Optional)
         config_dict: Dictionary with ThreeJS configuration. (Optional)
         global_step (int): Global step value to record (Optional)
         walltime (float): Optional override default walltime (time.time())
           seconds after epoch of event (Optional)
         description (string): A longform readable description of the summary data. Markdown is
           supported. (Optional)
+        keyframe_interval (int): If given, components that are identical to their last write
+          with this writer are stored as a reference to that step instead, e.g. static faces.
+          Each component is written in full at least every `keyframe_interval` writes. (Optional)
     Shape:
         vertices: :math:`(B, N, 3)`. (batch, number_of_vertices, channels)
         vert_colors: :math:`(B, N, 3)`. (batch, number_of_vertices, 3) with type `uint8`
@@ -51,8 +89,102 @@ def add_geometry(
         features: :math:`(B, N, 3)`. (batch, number_of_features, channels)
         feat_colors: :math:`(B, N, 3)`. (batch, number_of_features, 3) with type `uint8`
   '''
-  torch._C._log_api_usage_once("tensorboard.logging.add_geometry")
+  _log_api_usage("tensorboard.logging.add_geometry")
+
+  vertices, vert_colors, faces, face_colors, features, feat_colors = _to_arrays(
+    vertices, vert_colors, faces, face_colors, features, feat_colors
+  )
+  _check_geometry(vertices, vert_colors, faces, face_colors, features, feat_colors)
+
+  geometry = _geometry(
+    tag,
+    vertices,
+    vert_colors,
+    faces,
+    face_colors,
+    features,
+    feat_colors,
+    description,
+    config_dict
+  )
+  _reference_unchanged(writer, geometry.value, global_step, keyframe_interval)
+  _store_in_sidecar(writer, geometry.value)
+  _write_summary(writer, geometry, global_step, walltime)
+
+def use_sidecar_storage(writer, min_size=1 << 20):
+  '''Stores large components written with writer in a sidecar file next to the event file.
+    The summaries only contain the file name and offset of the data, which TensorBoard
+    memory maps to serve it without loading it first. The log directory must be local.
+
+    The sidecar file is closed with the writer. A `SummaryWriter` that is used
+    again after it was closed keeps appending to it.
+
+    Args:
+        writer: `SummaryWriter` or event file writer, see `add_geometry`.
+        min_size (int): Minimum size in bytes of components stored in the sidecar file.
+  '''
+  sidecar_writer = sidecar.SidecarWriter(_file_writer(writer).get_logdir())
+  _sidecars[writer] = (sidecar_writer, min_size)
+
+  close = writer.close
+  def close_with_sidecar(*args, **kwargs):
+    try:
+      return close(*args, **kwargs)
+    finally:
+      sidecar_writer.close()
+  writer.close = close_with_sidecar
 
+def add_geometries(writer, geometries, walltime=None, keyframe_interval=None):
+  '''Add many meshes or 3D point clouds at once, e.g. the predictions of an
+    evaluation loop. All geometries are validated before the first one is
+    written, and summary metadata is shared between geometries with the same
+    tag, shapes and configuration.
+
+    Args:
+        geometries: iterable of dicts with the arguments of `add_geometry`,
+          e.g. `{'tag': 'prediction/0', 'vertices': vertices, 'global_step': 1}`.
+        walltime (float): Walltime of geometries that do not specify one (Optional)
+        keyframe_interval (int): see `add_geometry` (Optional)
+  '''
+  _log_api_usage("tensorboard.logging.add_geometries")
+
+  entries = []
+
+  # all geometries are validated before any of them is written
+  for geometry in geometries:
+    geometry = dict(geometry)
+    tag = geometry.pop('tag')
+    global_step = geometry.pop('global_step', None)
+    event_walltime = geometry.pop('walltime', walltime)
+    description = geometry.pop('description', None)
+    # serialized right away, a shared dict may be changed for later geometries
+    json_config = _get_json_config(geometry.pop('config_dict', None))
+
+    tensors = _to_arrays(
+      geometry.pop('vertices'),
+      geometry.pop('vert_colors', None),
+      geometry.pop('faces', None),
+      geometry.pop('face_colors', None),
+      geometry.pop('features', None),
+      geometry.pop('feat_colors', None)
+    )
+    if geometry:
+      raise ValueError("Unknown arguments %s for geometry %s" % (sorted(geometry), tag))
+    _check_geometry(*tensors)
+
+    tensors = list(zip(tensors, _COMPONENTS))
+
+    entries.append((tag, global_step, event_walltime, description, json_config, tensors))
+
+  metadata_cache = {}
+  for tag, global_step, event_walltime, description, json_config, tensors in entries:
+    values = _geometry_values(tag, tensors, description, json_config, metadata_cache)
+    _reference_unchanged(writer, values, global_step, keyframe_interval)
+    _store_in_sidecar(writer, values)
+    _write_summary(writer, Summary(value=values), global_step, event_walltime)
+
+def _check_geometry(vertices, vert_colors, faces, face_colors, features, feat_colors):
+  """Raises a ValueError if the shapes of the components do not match."""
   n_vert = vertices.shape[1]
 
   # check vertices
@@ -85,22 +217,6 @@ def add_geometry(
   if feat_colors is not None and feat_colors.shape[1] != n_vert:
     raise ValueError("Number of features and colors for features must match, but got %s and %s" % (str(features.shape), str(feat_colors.shape)))
 
-  writer._get_file_writer()  \
-        .add_summary(
-          _geometry(
-            tag,
-            vertices,
-            vert_colors,
-            faces,
-            face_colors,
-            features,
-            feat_colors,
-            description,
-            config_dict
-          ),
-          global_step=global_step
-        )
-
 
 
 def _geometry(
@@ -133,16 +249,31 @@ def _geometry(
       config_dict: Dictionary with ThreeJS classes names and configuration.
     Returns:
       Merged summary for mesh/point cloud representation.'''
-  json_config = _get_json_config(config_dict)
-
-  tensors = [
-      (vertices, GeoPluginData.VERTICES),
-      (vert_colors, GeoPluginData.VERT_COLORS),
-      (faces, GeoPluginData.FACES),
-      (face_colors, GeoPluginData.FACE_COLORS),
-      (features, GeoPluginData.FEATURES),
-      (feat_colors, GeoPluginData.FEAT_COLORS)
-  ]
+  tensors = list(zip(
+    [vertices, vert_colors, faces, face_colors, features, feat_colors],
+    _COMPONENTS
+  ))
+
+  return Summary(value=_geometry_values(
+    tag,
+    tensors,
+    description,
+    _get_json_config(config_dict)
+  ))
+
+def _geometry_values(tag, tensors, description, json_config, metadata_cache=None):
+  """Creates the tensor summaries of all components of a geometry.
+  Args:
+    tag: A name for this summary operation.
+    tensors: list of (tensor or None, GeoPluginData.ContentType).
+    description: A longform readable description of the summary data.
+    json_config: A string, JSON-serialized dictionary of ThreeJS classes
+      configuration.
+    metadata_cache: optional dict to reuse summary metadata of components
+      with the same tag, shape and configuration.
+  Returns:
+    List of `Summary.Value`s.
+  """
   tensors = [tensor for tensor in tensors if tensor[0] is not None]
   
   components = metadata.get_components_bitmask(
@@ -158,13 +289,14 @@ def _geometry(
         tensor,
         content_type,
         components,
-        json_config
+        json_config,
+        metadata_cache
       )
     )
 
-  return Summary(value=summaries)
+  return summaries
 
-def _get_tensor_summary(name, description, tensor, content_type, components, json_config):
+def _get_tensor_summary(name, description, tensor, content_type, components, json_config, metadata_cache=None):
   """Creates a tensor summary with summary metadata.
   Args:
     name: Uniquely identifiable name of the summary op. Could be replaced by
@@ -178,57 +310,34 @@ def _get_tensor_summary(name, description, tensor, content_type, components, jso
       belong to the summary.
     json_config: A string, JSON-serialized dictionary of ThreeJS classes
       configuration.
+    metadata_cache: optional dict of previously created summary metadata.
   Returns:
     Tensor summary with metadata.
   """
 
-  tensor = torch.as_tensor(tensor)
-
-  tensor_metadata = metadata.create_summary_metadata(
-      name,
-      description,
-      content_type,
-      components,
-      tensor.shape,
-      json_config)
-
-  if (
-    content_type == GeoPluginData.VERTICES or
-    content_type == GeoPluginData.FEATURES  
-  ):
-    tensor = TensorProto(dtype='DT_FLOAT',
-                          float_val=tensor.reshape(-1).float().tolist(),
-                          tensor_shape=TensorShapeProto(dim=[
-                              TensorShapeProto.Dim(size=tensor.shape[0]),
-                              TensorShapeProto.Dim(size=tensor.shape[1]),
-                              TensorShapeProto.Dim(size=tensor.shape[2]),
-                          ]))
-  elif (
-    content_type == GeoPluginData.VERT_COLORS or
-    content_type == GeoPluginData.FEAT_COLORS
-  ):
-    tensor = TensorProto(dtype='DT_UINT8',
-                          int_val=tensor.reshape(-1).type(torch.uint8).tolist(),
-                          tensor_shape=TensorShapeProto(dim=[
-                              TensorShapeProto.Dim(size=tensor.shape[0]),
-                              TensorShapeProto.Dim(size=tensor.shape[1]),
-                              TensorShapeProto.Dim(size=tensor.shape[2]),
-                          ]))
-  elif content_type == GeoPluginData.FACE_COLORS:
-    tensor = TensorProto(dtype='DT_UINT8',
-                          int_val=tensor.reshape(-1).type(torch.uint8).tolist(),
-                          tensor_shape=TensorShapeProto(dim=[
-                              TensorShapeProto.Dim(size=tensor.shape[0]),
-                              TensorShapeProto.Dim(size=tensor.shape[1])
-                          ]))
-  elif content_type == GeoPluginData.FACES:
-    tensor = TensorProto(dtype='DT_INT32',
-                          int_val=tensor.reshape(-1).int().tolist(),
-                          tensor_shape=TensorShapeProto(dim=[
-                              TensorShapeProto.Dim(size=tensor.shape[0]),
-                              TensorShapeProto.Dim(size=tensor.shape[1]),
-                              TensorShapeProto.Dim(size=tensor.shape[2]),
-                          ]))
+  _, proto_dtype = _TENSOR_DTYPES[content_type]
+  # Cast (if needed) to a contiguous buffer, so the raw bytes can be written
+  # to `tensor_content` without going through Python lists.
+  tensor = _to_array(tensor, content_type)
+
+  key = (name, description, content_type, components, tuple(tensor.shape), json_config)
+  tensor_metadata = metadata_cache.get(key) if metadata_cache is not None else None
+  if tensor_metadata is None:
+    tensor_metadata = metadata.create_summary_metadata(
+        name,
+        description,
+        content_type,
+        components,
+        tensor.shape,
+        json_config)
+    if metadata_cache is not None:
+      metadata_cache[key] = tensor_metadata
+
+  tensor = TensorProto(dtype=proto_dtype,
+                        tensor_content=tensor.tobytes(),
+                        tensor_shape=TensorShapeProto(dim=[
+                            TensorShapeProto.Dim(size=size) for size in tensor.shape
+                        ]))
 
   tensor_summary = Summary.Value(
       tag=metadata.get_instance_name(name, content_type),
@@ -239,6 +348,118 @@ def _get_tensor_summary(name, description, tensor, content_type, components, jso
   return tensor_summary
 
 
+def _to_array(tensor, content_type, copy=False):
+  """Converts a tensor to a contiguous numpy array of the dtype the component
+  is stored with.
+  Args:
+    tensor: numpy array, torch tensor (also on GPU), or any object exposing
+      `__array__` or the buffer protocol.
+    content_type: GeoPluginData.ContentType of the tensor.
+    copy: if True, the result never shares memory with tensor.
+  Returns:
+    numpy array.
+  """
+  dtype, _ = _TENSOR_DTYPES[content_type]
+
+  # torch is only imported by users that log torch tensors
+  torch = sys.modules.get('torch')
+  if torch is not None and isinstance(tensor, torch.Tensor):
+    if tensor.device.type != 'cpu':
+      copy = False # the copy to host memory is not shared
+    tensor = tensor.detach().to(device='cpu', dtype=getattr(torch, dtype.name)).numpy()
+
+  if copy:
+    return np.array(tensor, dtype=dtype, order='C')
+  return np.ascontiguousarray(tensor, dtype=dtype)
+
+def _to_arrays(*tensors, copy=False):
+  """Converts the components (vertices, vert_colors, faces, face_colors,
+  features, feat_colors) of a geometry with _to_array, keeping Nones."""
+  return [
+    None if tensor is None else _to_array(tensor, content_type, copy)
+    for tensor, content_type in zip(tensors, _COMPONENTS)
+  ]
+
+def _reference_unchanged(writer, values, global_step, keyframe_interval, digests=None):
+  """Replaces the tensors of components that did not change since their last
+  keyframe by a reference to the keyframe's step.
+  Args:
+    writer: the writer the values are written with.
+    values: `Summary.Value`s of a geometry, modified in place.
+    global_step: step the values are written at.
+    keyframe_interval: maximum number of writes of a keyframe and its
+      references. References are disabled if it is None.
+    digests: optional list of the `_tensor_digest` of each value.
+  """
+  if not keyframe_interval or global_step is None:
+    return
+
+  global_step = int(global_step)
+  history = tag_history.setdefault(_file_writer(writer), {})
+  if digests is None:
+    digests = [_tensor_digest(value.tensor) for value in values]
+
+  for value, digest in zip(values, digests):
+    last = history.get(value.tag)
+    if (
+      last is not None and
+      last[0] == digest and
+      last[1] < global_step and
+      last[2] < keyframe_interval
+    ):
+      value.tensor.CopyFrom(metadata.create_reference_tensor(last[1]))
+      history[value.tag] = (digest, last[1], last[2] + 1)
+    else:
+      history[value.tag] = (digest, global_step, 1)
+
+def _store_in_sidecar(writer, values):
+  """Moves the content of large tensors into the sidecar file of writer, if
+  `use_sidecar_storage` was called for it."""
+  sidecar_storage = _sidecars.get(writer) or _sidecars.get(_file_writer(writer))
+  if sidecar_storage is None:
+    return
+
+  sidecar_writer, min_size = sidecar_storage
+  for value in values:
+    if len(value.tensor.tensor_content) >= min_size:
+      offset = sidecar_writer.append(value.tensor.tensor_content)
+      value.tensor.CopyFrom(metadata.create_sidecar_tensor(value.tensor, sidecar_writer.file_name, offset))
+
+def _tensor_digest(tensor_proto):
+  """Hashes dtype, shape and content of a tensor."""
+  digest = hashlib.sha1(tensor_proto.tensor_shape.SerializeToString())
+  digest.update(bytes([tensor_proto.dtype]))
+  digest.update(tensor_proto.tensor_content)
+  return digest.digest()
+
+def _file_writer(writer):
+  """Gets the file writer of a `torch.utils.tensorboard.SummaryWriter`."""
+  if hasattr(writer, '_get_file_writer'):
+    return writer._get_file_writer()
+  return writer
+
+def _write_summary(writer, summary, global_step, walltime):
+  """Writes a summary with a `torch.utils.tensorboard.SummaryWriter`, a file
+  writer with an `add_summary` method, or an event file writer such as
+  `tensorboard.summary.writer.event_file_writer.EventFileWriter`."""
+  writer = _file_writer(writer)
+
+  if hasattr(writer, 'add_summary'):
+    writer.add_summary(summary, global_step=global_step, walltime=walltime)
+  elif hasattr(writer, 'add_event'):
+    event = Event(summary=summary, wall_time=time.time() if walltime is None else walltime)
+    if global_step is not None:
+      event.step = int(global_step)
+    writer.add_event(event)
+  else:
+    raise TypeError("Cannot write summaries with %s." % type(writer).__name__)
+
+def _log_api_usage(event):
+  """Records API usage like torch's SummaryWriter, if torch is in use."""
+  torch = sys.modules.get('torch')
+  if torch is not None:
+    torch._C._log_api_usage_once(event)
+
 def _get_json_config(config_dict):
     """Parses and returns JSON string from python dictionary."""
     json_config = '{}'
@@ -8,6 +8,10 @@ from tests.parameters import tests as ParameterTests
 
 os.sys.path.append('..')
 from tensorboard_plugin_geometry.summary import add_geometry
+from tests.sidecars import tests as SidecarTests
+from tests.sampling import tests as SamplingTests
+from tests.server import tests as ServerTests
+from tests.lod import tests as LodTests
 
 SummaryWriter.add_geometry = add_geometry
 
@@ -33,8 +37,12 @@ print('start testing')
 s1 = test('./logs/parameters', ParameterTests)
 s2 = test('./logs/point_clouds', PointCloudTests)
 s3 = test('./logs/meshes', MeshTests)
+s4 = test('./logs/sidecars', SidecarTests)
+s5 = test('./logs/sampling', SamplingTests)
+s6 = test('./logs/server', ServerTests)
+s7 = test('./logs/lod', LodTests)
 
-succeeded, failed = accumulate_results([s1, s2, s3])
+succeeded, failed = accumulate_results([s1, s2, s3, s4, s5, s6, s7])
 print('')
 print(s1.divider % '')
 print('succeeded: %d     failed: %d' % (succeeded, failed))
@@ -1,12 +1,26 @@
+import threading
+
 import six
+from tensorboard import errors
 
+from .change_log import ChangeLog
 from .metadata import parse_plugin_metadata
+from .tensor_index import TensorIndex
 
 class TagServer():
 
-  def __init__(self, multiplexer, plugin_name):
+  def __init__(self, multiplexer, plugin_name, sampling_policy=None):
     self.plugin_name = plugin_name
     self._multiplexer = multiplexer
+    self.tensor_index = TensorIndex(multiplexer, sampling_policy)
+    # changes of the responses of the `/tags` and `/geometries` routes
+    self.change_log = ChangeLog()
+    # (run, instance_tag, content) -> parsed GeoPluginData
+    self._metadata = {}
+    # run -> (instance_tag -> content, tag -> instance_tags)
+    self._tag_index = {}
+    # requests and the step notifier use the indices concurrently
+    self._lock = threading.RLock()
 
   def get_tags_response(self):
     """A route (HTTP handler) that returns a response with tags.
@@ -15,27 +29,83 @@ class TagServer():
     Returns:
       A response that contains a JSON object. The keys of the object
       are all the runs. Each run is mapped to a (potentially empty)
-      list of all tags that are relevant to this plugin.
+      list of all tags that are relevant to this plugin, with the numbers
+      of kept and written steps of each tag.
     """
 
     all_runs = self._multiplexer.PluginRunToTagToContent(self.plugin_name)
 
+    # Forget runs that are no longer known to the multiplexer.
+    with self._lock:
+      for run in list(self._tag_index):
+        if run not in all_runs:
+          self._drop_run(run)
+
     response = dict()
     for run, tag_to_content in six.iteritems(all_runs):
       response[run] = dict()
 
-      for instance_tag, _ in six.iteritems(tag_to_content):
-        
-        # Make sure we only operate on user-defined tags here.
-        tag = self._tag(run, instance_tag)
-        meta, description = self._instance_tag_metadata(run, instance_tag)
-        
-        # Batch size must be defined, otherwise we don't know how many
-        # samples were there.
-        response[run][tag] = {"samples": meta.shape[0], "description": description}
+      for tag, instance_tags in six.iteritems(self._run_tag_index(run, tag_to_content)):
+        kept, written = 0, None
+        for instance_tag in instance_tags:
+          meta, description = self._instance_tag_metadata(run, instance_tag)
+          instance_kept, instance_written = self.tensor_index.step_counts(run, instance_tag)
+          kept = max(kept, instance_kept)
+          if instance_written is not None:
+            written = max(written or 0, instance_written)
+
+          # Batch size must be defined, otherwise we don't know how many
+          # samples were there.
+          response[run][tag] = {"samples": meta.shape[0], "description": description}
+        response[run][tag]["steps"] = {"kept": kept, "written": written}
     
     return response
 
+  def get_tag_changes(self, since):
+    """Gets the runs and tags that were added, changed or removed since the
+    token of an earlier response, see `ChangeLog.changes`.
+    Returns:
+      A JSON object with the new `token`, whether the tags were `reset`, the
+      `changed` tags of each run in the format of `get_tags_response` and
+      the `removed` tags of each run or null, if the whole run was removed.
+      None if nothing changed.
+    """
+    entries = dict()
+    for run, tags in six.iteritems(self.get_tags_response()):
+      entries[(run, None)] = True
+      for tag, entry in six.iteritems(tags):
+        entries[(run, tag)] = entry
+    self.change_log.update('tags', entries)
+
+    token, reset, changed, removed = self.change_log.changes('tags', since)
+    if not reset and not changed and not removed:
+      return None
+
+    response = {"token": token, "reset": reset, "changed": dict(), "removed": dict()}
+    for run, tag in changed:
+      tags = response["changed"].setdefault(run, dict())
+      if tag is not None:
+        tags[tag] = changed[(run, tag)]
+    for run, tag in removed:
+      if tag is None:
+        response["removed"][run] = None
+      elif response["removed"].get(run, []) is not None:
+        response["removed"].setdefault(run, []).append(tag)
+    return response
+
+  def get_steps(self, run, tag):
+    """Gets the loaded steps of a tag.
+    Returns:
+      dict mapping steps to the latest wall time of their events and the
+      sorted content types of their components.
+    """
+    steps = dict()
+    for instance_tag in self._instance_tags(run, tag):
+      meta, _ = self._instance_tag_metadata(run, instance_tag)
+      for event in self.tensor_index.tensors(run, instance_tag):
+        wall_time, components = steps.get(event.step, (0, []))
+        steps[event.step] = (max(wall_time, event.wall_time), sorted(components + [meta.content_type]))
+    return steps
 
   def collect_tensor_events(self, request, step=None):
     """Collects list of tensor events based on request."""
@@ -44,15 +114,11 @@ class TagServer():
 
     tensor_events = []  # List of tuples (meta, tensor) that contain tag.
     for instance_tag in self._instance_tags(run, tag):
-        tensors = self._multiplexer.Tensors(run, instance_tag)
+        tensors = self.tensor_index.tensors(run, instance_tag, step)
         meta, description = self._instance_tag_metadata(run, instance_tag)
         tensor_events += [(meta, tensor, description) for tensor in tensors]
 
-    if step is not None:
-        tensor_events = [
-            event for event in tensor_events if event[1].step == step
-        ]
-    else:
+    if step is None:
         # Make sure tensors sorted by step in ascending order.
         tensor_events = sorted(
             tensor_events, key=lambda tensor_data: tensor_data[1].step
@@ -68,21 +134,65 @@ class TagServer():
     """Gets the `GeoPluginData` proto for an instance tag."""
     summary_metadata = self._multiplexer.SummaryMetadata(run, instance_tag)
     content = summary_metadata.plugin_data.content
-    metadata = parse_plugin_metadata(content)
+    metadata = self._parse_metadata(run, instance_tag, content)
 
     return metadata, summary_metadata.summary_description
 
+  def _parse_metadata(self, run, instance_tag, content):
+    """Parses plugin content once and caches it for later requests."""
+    key = (run, instance_tag, content)
+    with self._lock:
+      metadata = self._metadata.get(key)
+      if metadata is None:
+        metadata = parse_plugin_metadata(content)
+        self._metadata[key] = metadata
+      return metadata
+
   def _tag(self, run, instance_tag):
     """Gets the user-facing tag name for an instance tag."""
     meta, _ = self._instance_tag_metadata(run, instance_tag)
     return meta.name
 
   def _instance_tags(self, run, tag):
-    """Gets the instance tag names for a user-facing tag."""
-    index = self._multiplexer.GetAccumulator(run).PluginTagToContent(self.plugin_name)
-    
-    return [
-      instance_tag
-      for (instance_tag, content) in six.iteritems(index)
-      if tag == parse_plugin_metadata(content).name
-    ]
+    """Gets the instance tag names for a user-facing tag.
+    Raises:
+      errors.NotFoundError: if the run or the tag is not loaded.
+    """
+    try:
+      tag_to_content = self._multiplexer.GetAccumulator(run).PluginTagToContent(self.plugin_name)
+    except KeyError: # unknown run or a run without geometries
+      raise errors.NotFoundError('run %s' % run)
+
+    instance_tags = self._run_tag_index(run, tag_to_content).get(tag)
+    if not instance_tags:
+      raise errors.NotFoundError('tag %s of run %s' % (tag, run))
+    return instance_tags
+
+  def _run_tag_index(self, run, tag_to_content):
+    """Gets the mapping of user-facing tags to instance tags of a run.
+    The mapping is rebuilt only if the plugin content of the run changed
+    since the last call, i.e. after the multiplexer loaded new tags.
+    """
+    with self._lock:
+      cached_content, index = self._tag_index.get(run, (None, None))
+      if cached_content == tag_to_content:
+        return index
+
+      if cached_content is not None:
+        self._drop_run(run, keep=tag_to_content)
+
+      index = dict()
+      for instance_tag, content in six.iteritems(tag_to_content):
+        tag = self._parse_metadata(run, instance_tag, content).name
+        index.setdefault(tag, []).append(instance_tag)
+
+      self._tag_index[run] = (tag_to_content, index)
+      return index
+
+  def _drop_run(self, run, keep=None):
+    """Removes cached metadata of a run, except for unchanged content in keep."""
+    keep = keep or dict()
+    cached_content, _ = self._tag_index.pop(run)
+    for instance_tag, content in six.iteritems(cached_content):
+      if keep.get(instance_tag) != content:
+        self._metadata.pop((run, instance_tag, content), None)
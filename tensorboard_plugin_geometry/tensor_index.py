@@ -0,0 +1,173 @@
+import collections
+import threading
+
+from tensorboard.util import tb_logging
+
+from . import metadata
+from .sampling import SamplingPolicy
+from .sidecar import SidecarReader
+
+logger = tb_logging.get_logger()
+
+class TensorIndex():
+  """Indexes the tensor events of each (run, instance tag) by their step.
+
+  The index of an instance tag is built on first use and updated whenever
+  the multiplexer has loaded new tensor events for it. Events that refer to
+  the data of a previous step (see `metadata.create_reference_tensor`) are
+  resolved to the tensor of that step, events that refer to a sidecar file
+  (see `metadata.create_sidecar_tensor`) to a view of the mapped file.
+
+  With policies that trim steps (see `SamplingPolicy`) the multiplexer
+  loads up to `--geometry_loaded_steps` steps and the index lists only the
+  steps the policy keeps. The events are shared with the multiplexer and
+  never modified, so references to steps that are not listed still resolve.
+  """
+
+  def __init__(self, multiplexer, policy=None):
+    self._multiplexer = multiplexer
+    self._policy = policy or SamplingPolicy()
+    # (run, instance_tag) -> (number of events, last event, resolved events,
+    # step -> events, listed events, step -> listed events)
+    self._index = {}
+    # (run, instance_tag) -> number of loaded steps, including dropped ones
+    self._written = {}
+    # run -> number of updates of indexed instance tags of the run
+    self._generations = collections.defaultdict(int)
+    self._sidecar_reader = SidecarReader()
+    # requests and the step notifier update the index concurrently
+    self._lock = threading.RLock()
+    # (run, instance_tag) with references to steps that are not loaded
+    self._warned = set()
+
+  def tensors(self, run, instance_tag, step=None):
+    """Gets the tensor events of an instance tag.
+    Args:
+      run: name of the run.
+      instance_tag: instance tag name of a geometry component.
+      step: if given, only events of this step are returned.
+    Returns:
+      List of `TensorEvent`s. References whose step is no longer loaded,
+      e.g. because it was sampled out of the reservoir, and events whose
+      sidecar file cannot be read are omitted.
+    """
+    events, by_step = self._step_index(run, instance_tag)
+    if step is None:
+      return events
+    return by_step.get(step, [])
+
+  def generation(self, run):
+    """Gets a counter that changes whenever new tensor events of the run
+    were indexed."""
+    return self._generations[run]
+
+  def step_counts(self, run, instance_tag):
+    """Gets the number of listed and of loaded steps of an instance tag.
+    Returns:
+      Tuple of the numbers of listed and written steps. The number of written
+      steps is None if TensorBoard samples the steps, since it does not tell
+      how many it discarded.
+    """
+    _, by_step = self._step_index(run, instance_tag)
+    if not self._policy.trims:
+      return len(by_step), None
+    return len(by_step), self._written.get((run, instance_tag), 0)
+
+  def latest_step(self, run, instance_tag):
+    """Gets the step of the most recently loaded event of an instance tag."""
+    tensors = self._multiplexer.Tensors(run, instance_tag)
+    return tensors[-1].step if tensors else None
+
+  def _step_index(self, run, instance_tag):
+    """Gets the up-to-date resolved events and step index of an instance
+    tag."""
+    with self._lock:
+      return self._update(run, instance_tag, self._multiplexer.Tensors(run, instance_tag))
+
+  def _update(self, run, instance_tag, tensors):
+    """Updates the index of an instance tag with the given tensor events."""
+    key = (run, instance_tag)
+    n_events, last_event, events, by_step, listed, listed_by_step = self._index.get(
+      key, (0, None, None, None, None, None)
+    )
+
+    if by_step is not None and n_events == len(tensors) and (
+      not tensors or last_event is tensors[-1]
+    ):
+      return listed, listed_by_step
+    written = self._written.get(key, 0)
+
+    # The multiplexer always appends new events to the end of the reservoir,
+    # so if all previously indexed events are still in place only the new
+    # ones must be added. Otherwise events were sampled out or purged.
+    if (
+      by_step is not None and
+      0 < n_events < len(tensors) and
+      tensors[n_events - 1] is last_event
+    ):
+      new_tensors = tensors[n_events:]
+      written += len(set(event.step for event in new_tensors) - set(by_step))
+    else:
+      events = []
+      by_step = {}
+      new_tensors = tensors
+      written = max(written, len(set(event.step for event in tensors)))
+    self._written[key] = written
+
+    self._generations[run] += 1
+
+    for event in new_tensors:
+      event = self._resolve(run, instance_tag, event, by_step)
+      if event is None:
+        continue
+
+      events.append(event)
+      by_step.setdefault(event.step, []).append(event)
+
+    listed, listed_by_step = events, by_step
+    if self._policy.trims:
+      selected = self._policy.select(sorted(by_step))
+      listed = [event for event in events if event.step in selected]
+      listed_by_step = {step: by_step[step] for step in selected}
+
+    self._index[key] = (
+      len(tensors), tensors[-1] if tensors else None, events, by_step, listed, listed_by_step
+    )
+    return listed, listed_by_step
+
+  def _resolve(self, run, instance_tag, event, by_step):
+    """Resolves the tensor of a loaded event.
+    Returns:
+      The resolved event or None if its keyframe or sidecar file is missing.
+    """
+    tensor_proto = event.tensor_proto
+    reference = metadata.get_reference_step(tensor_proto)
+    if reference is not None:
+      keyframe = by_step.get(reference)
+      if not keyframe:
+        self._warn_missing_keyframe(run, instance_tag, event.step, reference)
+        return None
+      event = event._replace(tensor_proto=keyframe[-1].tensor_proto)
+
+    location = metadata.get_sidecar_location(event.tensor_proto)
+    if location is not None:
+      tensor = self._sidecar_reader.get_tensor(
+        self._multiplexer.RunPaths().get(run, ''), event.tensor_proto, *location
+      )
+      if tensor is None:
+        return None
+      event = event._replace(tensor_proto=tensor)
+    return event
+
+  def _warn_missing_keyframe(self, run, instance_tag, step, reference):
+    """Logs once per instance tag that a reference cannot be shown, as
+    TensorBoard sampled out the step it refers to."""
+    if (run, instance_tag) in self._warned:
+      return
+    self._warned.add((run, instance_tag))
+    logger.warning(
+      'Step %d of %s in run %s refers to step %d, which is not loaded, so it '
+      'is not shown. Geometries written with keyframe_interval need '
+      '--samples_per_plugin geometries=0 or a --geometry_sampling policy '
+      'other than reservoir with enough --geometry_loaded_steps.', step, instance_tag, run, reference
+    )
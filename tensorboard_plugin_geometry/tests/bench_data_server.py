@@ -0,0 +1,60 @@
+import numpy as np
+from tensorboard.backend.event_processing.plugin_event_accumulator import TensorEvent
+from tensorboard.util import tensor_util
+
+from tensorboard_plugin_geometry.data_server import DataServer
+from tensorboard_plugin_geometry.plugin import DEFAULT_DECODE_THREADS
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+from tensorboard_plugin_geometry.stats import get_sample_stats
+
+from .bench_writer import _legacy_tensor_proto, _tensor_proto
+from .utils import Benchmark, get_rand_vecs
+
+# number of vertices of tests/bunny.ply and a large point cloud
+sizes = [34834, 1000000]
+# samples and vertices per sample of a batch
+batch = (32, 100000)
+
+def benchmarks():
+  bench = Benchmark('data server benchmarks')
+  data_server = DataServer(None, None, None)
+
+  for n_vert in sizes:
+    pos, _ = get_rand_vecs(n_vert)
+    pos = pos.reshape(1, n_vert, 3)
+    packed = _event(_tensor_proto(pos, GeoPluginData.VERTICES))
+    legacy = _event(_legacy_tensor_proto(pos, GeoPluginData.VERTICES))
+
+    assert _legacy_response(packed) == data_server._get_tensor_bytes(packed, GeoPluginData.VERTICES)
+
+    bench.run_benchmark('list response %d vertices' % n_vert, _legacy_response, packed)
+    bench.run_benchmark('raw bytes %d vertices' % n_vert,
+      data_server._get_tensor_bytes, packed, GeoPluginData.VERTICES)
+    bench.run_benchmark('raw bytes (list values) %d vertices' % n_vert,
+      data_server._get_tensor_bytes, legacy, GeoPluginData.VERTICES)
+    bench.run_benchmark('sample stats %d vertices' % n_vert,
+      get_sample_stats, pos.numpy(), GeoPluginData.VERTICES)
+    bench.run_benchmark('sample stats %d features' % n_vert,
+      get_sample_stats, pos.numpy(), GeoPluginData.FEATURES)
+
+  # A batch logged as one tensor per sample and one float64 tensor, which is
+  # converted to float32.
+  n_samples, n_vert = batch
+  pos = np.random.randn(n_samples, n_vert, 3)
+  packed = [_event(_tensor_proto(sample.reshape(1, n_vert, 3).astype(np.float32), GeoPluginData.VERTICES)) for sample in pos]
+  float64 = [_event(tensor_util.make_tensor_proto(pos))]
+  for threads in sorted({1, DEFAULT_DECODE_THREADS}):
+    data_server = DataServer(None, None, None, threads)
+    bench.run_benchmark('%d tensors %d threads' % (n_samples, threads),
+      data_server._get_component, packed, GeoPluginData.VERTICES)
+    bench.run_benchmark('%d float64 samples %d threads' % (n_samples, threads),
+      data_server._get_component, float64, GeoPluginData.VERTICES)
+  return bench
+
+def _event(tensor_proto):
+  return TensorEvent(wall_time=0, step=0, tensor_proto=tensor_proto)
+
+def _legacy_response(event):
+  """The pre-binary response path, kept for comparison."""
+  response = [tensor_util.make_ndarray(event.tensor_proto).tolist()]
+  return np.array(response, dtype=np.float32).reshape(-1).tobytes()
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+from .utils import Benchmark
+
+modules = [
+  'tensorboard_plugin_geometry',
+  'tensorboard_plugin_geometry.plugin',
+  'torch',
+]
+
+# prints whether importing the module pulled in torch
+_SCRIPT = "import sys; import %s; print('torch' in sys.modules)"
+
+def benchmarks():
+  bench = Benchmark('import benchmarks', repeat=5)
+  bench.run_benchmark('python startup', _run, 'pass')
+  for module in modules:
+    bench.run_benchmark('import %s' % module, _run, _SCRIPT % module)
+    print('%-50s %10s' % ('  imports torch', _run(_SCRIPT % module).strip()))
+  return bench
+
+def _run(script):
+  """Runs script in a fresh interpreter, so no module is imported yet."""
+  root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+  return subprocess.run(
+    [sys.executable, '-c', script],
+    check=True,
+    stdout=subprocess.PIPE,
+    stderr=subprocess.DEVNULL,
+    cwd=root,
+    universal_newlines=True,
+  ).stdout
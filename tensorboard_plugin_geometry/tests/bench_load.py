@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tensorboard.backend.event_processing import plugin_event_multiplexer
+from tensorboard.plugins import base_plugin
+from torch.utils.tensorboard import SummaryWriter
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from tensorboard_plugin_geometry.plugin import GeoPlugin
+from tensorboard_plugin_geometry.summary import add_geometry
+
+from .utils import Benchmark, get_rand_vecs
+
+# number of vertices of each step of the synthetic logdir
+n_vert = 200000
+steps = 4
+# number of concurrent clients
+clients = [1, 8, 32]
+# requests of each client
+requests_per_client = 8
+
+def benchmarks():
+  bench = Benchmark('load benchmarks')
+  logdir = tempfile.mkdtemp()
+  try:
+    multiplexer = _synthetic_logdir(logdir)
+    context = base_plugin.TBContext(multiplexer=multiplexer, logdir=logdir)
+
+    for n_clients in clients:
+      for precision in ['float32', 'uint16']:
+        # A fresh plugin has an empty cache, so all clients request the same
+        # steps while they are decoded for the first time.
+        plugin = GeoPlugin(context)
+        title = '/data %s %d clients' % (precision, n_clients)
+        _report(bench, title + ' cold', _load(plugin, n_clients, precision))
+        _report(bench, title + ' warm', _load(plugin, n_clients, precision))
+        stats = plugin._data_server.get_cache_stats()
+        print('%-50s %10d / %d / %d' % (
+          'misses / coalesced / hits', stats['misses'], stats['coalesced'], stats['hits']
+        ), flush=True)
+  finally:
+    shutil.rmtree(logdir, ignore_errors=True)
+  return bench
+
+def _synthetic_logdir(logdir):
+  """Writes a run with a point cloud and features at a few steps and loads it."""
+  writer = SummaryWriter(log_dir=os.path.join(logdir, 'run'))
+  for step in range(steps):
+    pos, wss = get_rand_vecs(n_vert)
+    add_geometry(writer, 'bench', pos.reshape(1, n_vert, 3), features=wss.reshape(1, n_vert, 3), global_step=step)
+  writer.close()
+
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': 0})
+  multiplexer.AddRunsFromDirectory(logdir)
+  multiplexer.Reload()
+  return multiplexer
+
+def _load(plugin, n_clients, precision):
+  """Fires requests_per_client `/data` requests from each of n_clients
+  threads and returns the latencies in ms."""
+  client = Client(plugin.get_plugin_apps()['/data'], Response)
+  urls = [
+    '/data?run=run&tag=bench&content_type=%s&step=%d&precision=%s' % (content_type, step, precision)
+    for step in range(steps)
+    for content_type in ['VERTICES', 'FEATURES']
+  ]
+
+  def run_client(offset):
+    latencies = []
+    for i in range(requests_per_client):
+      start = time.perf_counter()
+      response = client.get(urls[(offset + i) % len(urls)])
+      assert response.status_code == 200, response.status
+      latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+  with ThreadPoolExecutor(n_clients) as executor:
+    # all clients start with the same url, like viewers opening one tag
+    return [latency for latencies in executor.map(run_client, [0] * n_clients) for latency in latencies]
+
+def _report(bench, title, latencies):
+  """Prints and records the p50 and p99 latency."""
+  latencies = sorted(latencies)
+  for name, q in [('p50', 0.5), ('p99', 0.99)]:
+    value = latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    bench.results['%s %s' % (title, name)] = value
+    print('%-50s %10.3f ms' % ('%s %s' % (title, name), value), flush=True)
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+from tensorboard.plugins import base_plugin
+
+from tensorboard_plugin_geometry.plugin import GeoPlugin
+
+from .bench_tag_server import FakeMultiplexer
+from .utils import Benchmark
+
+runs = [100, 1000]
+
+# Imports the modules TensorBoard imports before it loads plugins, then
+# prints the time in ms it takes to load the plugin like
+# `tensorboard --logdir` does.
+_SCRIPT = (
+  "from tensorboard.backend.event_processing import plugin_event_multiplexer; "
+  "from tensorboard.plugins import base_plugin; "
+  "import time, werkzeug; "
+  "start = time.perf_counter(); "
+  "from tensorboard_plugin_geometry.plugin_loader import GeoPluginLoader; "
+  "GeoPluginLoader().load(base_plugin.TBContext("
+  "multiplexer=plugin_event_multiplexer.EventMultiplexer(), logdir='.')); "
+  "print((time.perf_counter() - start) * 1000)"
+)
+
+class InactiveMultiplexer(FakeMultiplexer):
+  """Runs with tags of other plugins only."""
+
+  def PluginRunToTagToContent(self, plugin_name):
+    return {run: dict() for run in self.RunPaths()}
+
+def benchmarks():
+  bench = Benchmark('startup benchmarks', repeat=5)
+  timings = sorted(_load_time() for _ in range(bench.repeat))
+  bench.results['load plugin'] = timings[len(timings) // 2]
+  print('%-50s %10.3f ms' % ('load plugin', bench.results['load plugin']), flush=True)
+
+  for n_runs in runs:
+    for name, multiplexer in [('active', FakeMultiplexer(n_runs)), ('inactive', InactiveMultiplexer(n_runs))]:
+      context = base_plugin.TBContext(multiplexer=multiplexer, logdir='.')
+      plugin = GeoPlugin(context)
+      bench.run_benchmark('is_active first call %s %d runs' % (name, n_runs),
+        lambda: GeoPlugin(context).is_active())
+      bench.run_benchmark('is_active cached %s %d runs' % (name, n_runs), plugin.is_active)
+  return bench
+
+def _load_time():
+  """Loads the plugin in a fresh interpreter, so that no module of the
+  plugin is imported yet, and returns the time it took in ms."""
+  root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+  return float(subprocess.run(
+    [sys.executable, '-c', _SCRIPT],
+    check=True,
+    stdout=subprocess.PIPE,
+    stderr=subprocess.DEVNULL,
+    cwd=root,
+    universal_newlines=True,
+  ).stdout)
@@ -0,0 +1,53 @@
+from tensorboard_plugin_geometry import metadata
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+from tensorboard_plugin_geometry.tag_server import TagServer
+
+from .utils import Benchmark
+
+runs = [100, 1000]
+tags_per_run = 5
+content_types = [
+  GeoPluginData.VERTICES,
+  GeoPluginData.FACES,
+  GeoPluginData.FEATURES,
+]
+
+class FakeMultiplexer():
+  """Serves summary metadata of many runs without reading event files."""
+
+  def __init__(self, n_runs):
+    components = metadata.get_components_bitmask(content_types)
+    self._summary_metadata = {}
+    self._run_paths = {'run_%d' % run: 'run_%d' % run for run in range(n_runs)}
+    for run in range(n_runs):
+      for tag in range(tags_per_run):
+        for content_type in content_types:
+          instance_tag = metadata.get_instance_name('tag_%d' % tag, content_type)
+          self._summary_metadata[('run_%d' % run, instance_tag)] = metadata.create_summary_metadata(
+            'tag_%d' % tag, 'description', content_type, components, [1, 1000, 3], '{}')
+
+  def PluginRunToTagToContent(self, plugin_name):
+    all_runs = dict()
+    for (run, instance_tag), summary_metadata in self._summary_metadata.items():
+      all_runs.setdefault(run, dict())[instance_tag] = summary_metadata.plugin_data.content
+    return all_runs
+
+  def SummaryMetadata(self, run, instance_tag):
+    return self._summary_metadata[(run, instance_tag)]
+
+  def RunPaths(self):
+    return dict(self._run_paths)
+
+  def Tensors(self, run, instance_tag):
+    return []
+
+def benchmarks():
+  bench = Benchmark('tag server benchmarks')
+  for n_runs in runs:
+    multiplexer = FakeMultiplexer(n_runs)
+    tag_server = TagServer(multiplexer, metadata.PLUGIN_NAME)
+
+    bench.run_benchmark('/tags uncached %d runs' % n_runs,
+      lambda: TagServer(multiplexer, metadata.PLUGIN_NAME).get_tags_response())
+    bench.run_benchmark('/tags cached %d runs' % n_runs, tag_server.get_tags_response)
+  return bench
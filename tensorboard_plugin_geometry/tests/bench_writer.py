@@ -0,0 +1,95 @@
+import torch
+from tensorboard.compat.proto.summary_pb2 import Summary
+from tensorboard.compat.proto.tensor_pb2 import TensorProto
+from tensorboard.compat.proto.tensor_shape_pb2 import TensorShapeProto
+
+from tensorboard_plugin_geometry import summary
+from tensorboard_plugin_geometry.geometry_logger import GeometryLogger
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+
+from .utils import Benchmark, get_rand_vecs
+
+sizes = [1000, 100000, 1000000]
+
+def benchmarks():
+  bench = Benchmark('writer benchmarks', repeat=3)
+  for n_vert in sizes:
+    pos, wss = get_rand_vecs(n_vert)
+    colors = torch.randint(0, 256, (1, n_vert, 3), dtype=torch.uint8)
+    tensors = [
+      (pos.reshape(1, n_vert, 3), GeoPluginData.VERTICES),
+      (wss.reshape(1, n_vert, 3), GeoPluginData.FEATURES),
+      (colors, GeoPluginData.VERT_COLORS),
+    ]
+
+    bench.run_benchmark('list values %d vertices' % n_vert, _write, _legacy_tensor_proto, tensors)
+    bench.run_benchmark('tensor_content %d vertices' % n_vert, _write, _tensor_proto, tensors)
+
+    print('%-50s %10d / %d bytes' % (
+      'serialized size %d vertices' % n_vert,
+      _serialized_size(_legacy_tensor_proto, tensors),
+      _serialized_size(_tensor_proto, tensors)
+    ))
+
+    # cost of a logging call on the training thread, the logger is flushed
+    # before each call so that it does not compete with the previous one
+    writer = _NullWriter()
+    logger = GeometryLogger(writer)
+    vertices, features = pos.reshape(1, n_vert, 3), wss.reshape(1, n_vert, 3)
+    bench.run_benchmark('add_geometry %d vertices' % n_vert, summary.add_geometry, writer, 'bench', vertices, colors, None, None, features)
+    bench.run_benchmark('GeometryLogger %d vertices' % n_vert, logger.add_geometry, 'bench', vertices, colors, None, None, features, setup=logger.flush)
+    logger.close()
+
+  # a burst of small meshes of 20 tags over 10 steps
+  config_dict = {'camera': {'fov': 40}}
+  geometries = [{
+    'tag': 'prediction/%d' % (i % 20),
+    'vertices': torch.rand(1, 5000, 3),
+    'faces': torch.randint(0, 5000, (1, 8000, 3)),
+    'config_dict': config_dict,
+    'global_step': i // 20,
+  } for i in range(200)]
+  bench.run_benchmark('add_geometry x%d meshes' % len(geometries), _add_each, _NullWriter(), geometries)
+  bench.run_benchmark('add_geometries %d meshes' % len(geometries), summary.add_geometries, _NullWriter(), geometries)
+  return bench
+
+def _add_each(writer, geometries):
+  for geometry in geometries:
+    summary.add_geometry(writer, **geometry)
+
+class _NullWriter():
+  """SummaryWriter that serializes summaries without writing them."""
+
+  def _get_file_writer(self):
+    return self
+
+  def add_summary(self, summary, global_step=None, walltime=None):
+    summary.SerializeToString()
+
+  def flush(self):
+    pass
+
+def _write(to_proto, tensors):
+  Summary(value=[
+    Summary.Value(tag=str(content_type), tensor=to_proto(tensor, content_type))
+    for tensor, content_type in tensors
+  ]).SerializeToString()
+
+def _serialized_size(to_proto, tensors):
+  return sum(to_proto(tensor, content_type).ByteSize() for tensor, content_type in tensors)
+
+def _tensor_proto(tensor, content_type):
+  return summary._get_tensor_summary(
+    'bench', None, tensor, content_type, 0, '{}'
+  ).tensor
+
+def _legacy_tensor_proto(tensor, content_type):
+  """The pre-`tensor_content` write path, kept for comparison."""
+  shape = TensorShapeProto(dim=[TensorShapeProto.Dim(size=size) for size in tensor.shape])
+  if content_type in (GeoPluginData.VERTICES, GeoPluginData.FEATURES):
+    return TensorProto(dtype='DT_FLOAT',
+                       float_val=tensor.reshape(-1).float().tolist(),
+                       tensor_shape=shape)
+  return TensorProto(dtype='DT_UINT8',
+                     int_val=tensor.reshape(-1).type(torch.uint8).tolist(),
+                     tensor_shape=shape)
@@ -0,0 +1,37 @@
+import numpy as np
+
+from tensorboard_plugin_geometry import lod
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+
+from .utils import Suite
+
+def tests(writer):
+  suite = Suite('level of detail tests', writer)
+  suite.run_test('decimated mesh size', test_decimated_mesh_size)
+  suite.run_test('decimated point cloud size', test_decimated_point_cloud_size)
+  return suite
+
+######### tests #################
+def test_decimated_mesh_size(writer):
+  # The voxel grid must neither keep more than max_points vertices nor
+  # collapse the mesh into much fewer.
+  rng = np.random.RandomState(0)
+  for vertices, max_points in [(100, 10), (1000, 100), (10000, 37), (20000, 5000)]:
+    components = {
+      GeoPluginData.VERTICES: rng.rand(2, vertices, 3).astype(np.float32),
+      GeoPluginData.VERT_COLORS: rng.randint(0, 255, (2, vertices, 3)).astype(np.uint8),
+      GeoPluginData.FACES: rng.randint(0, vertices, (2, vertices * 2, 3)).astype(np.int32),
+    }
+    result = lod.decimate(components, max_points)
+    for sample_vertices, sample_faces in zip(components[GeoPluginData.VERTICES], components[GeoPluginData.FACES]):
+      kept, faces = lod._cluster_vertices(sample_vertices, sample_faces, max_points)
+      assert max_points * 0.8 <= len(kept) <= max_points, (vertices, max_points, len(kept))
+      assert faces.max() < len(kept)
+    assert result[GeoPluginData.VERTICES].shape[1] <= max_points
+    assert result[GeoPluginData.VERT_COLORS].shape == result[GeoPluginData.VERTICES].shape
+
+def test_decimated_point_cloud_size(writer):
+  vertices = np.random.RandomState(0).rand(1, 100, 3).astype(np.float32)
+  result = lod.decimate({GeoPluginData.VERTICES: vertices}, 10)
+  assert result[GeoPluginData.VERTICES].shape == (1, 10, 3)
+  assert (result[GeoPluginData.VERTICES] == vertices[:, ::10]).all()
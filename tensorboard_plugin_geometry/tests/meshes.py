@@ -25,6 +25,7 @@ def tests(writer):
   suite.run_test('mesh with features', test_mesh_with_features)
   suite.run_test('mesh with colored features', test_mesh_with_colored_features)
   suite.run_test('multiple meshes', test_multiple_meshes)
+  suite.run_test('mesh with keyframes', test_mesh_with_keyframes)
   return suite
 
 ######### tests #################
@@ -36,6 +37,16 @@ def test_mesh(writer):
       faces=face_bunny.reshape(1, bunny_nface, 3),
       global_step=i)
 
+def test_mesh_with_keyframes(writer):
+  # faces are only written at steps 0 and 5, the other steps refer to them
+  for i in range(10):
+    writer.add_geometry(
+      'test_geo_with_keyframes',
+      i * pos_bunny.reshape(1, bunny_nvert, 3),
+      faces=face_bunny.reshape(1, bunny_nface, 3),
+      global_step=i,
+      keyframe_interval=5)
+
 def test_mesh_with_features(writer):
   for i in range(10):
     writer.add_geometry(
@@ -1,5 +1,12 @@
+import json
+
 import torch
 import numpy as np
+from tensorboard.backend.event_processing import plugin_event_multiplexer
+
+from tensorboard_plugin_geometry import metadata
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+from tensorboard_plugin_geometry.summary import add_geometries
 
 from .utils import Suite
 
@@ -22,6 +29,7 @@ def tests(writer):
   suite.run_test('normal orthografic camera', test_camera_config)
   suite.run_test('orthografic configs', test_orthografic_config)
   suite.run_test('override steps', save_multi_geo_for_sample_step)
+  suite.run_test('changed shared config', test_changed_shared_config)
 
   return suite
 
@@ -141,3 +149,25 @@ def save_multi_geo_for_sample_step(writer):
     'test_multi_for_same_step',
     pos.reshape(1, vertices * 2, 3),
     global_step=0)
+
+def test_changed_shared_config(writer):
+  # A config dict changed between geometries of one call must be written as
+  # it was when each geometry was passed.
+  pos, _ = get_rand_vecs(vertices)
+  config_dict = {}
+  def geometries():
+    for i in range(3):
+      config_dict['scene'] = {'background_color': [i, i, i]}
+      yield {'tag': 'test_shared_config/%d' % i, 'vertices': pos.reshape(1, vertices, 3), 'config_dict': config_dict}
+  add_geometries(writer, geometries())
+  writer.flush()
+
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': 0})
+  multiplexer.AddRunsFromDirectory(writer.get_logdir())
+  multiplexer.Reload()
+  run = list(multiplexer.Runs())[0]
+  for i in range(3):
+    instance_tag = metadata.get_instance_name('test_shared_config/%d' % i, GeoPluginData.VERTICES)
+    content = multiplexer.SummaryMetadata(run, instance_tag).plugin_data.content
+    config = json.loads(metadata.parse_plugin_metadata(content).json_config)
+    assert config['scene']['background_color'] == [i, i, i], config
@@ -0,0 +1,109 @@
+import argparse
+import logging
+
+import numpy as np
+import torch
+from tensorboard.backend.event_processing import plugin_event_multiplexer
+from tensorboard.plugins import base_plugin
+from tensorboard.util import tb_logging
+
+from tensorboard_plugin_geometry import metadata
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+from tensorboard_plugin_geometry.plugin_loader import GeoPluginLoader
+from tensorboard_plugin_geometry.sampling import DEFAULT_LOADED_STEPS, DEFAULT_STRIDE, SamplingPolicy
+from tensorboard_plugin_geometry.tensor_index import TensorIndex
+
+from .utils import Suite
+
+steps = 20
+kept = 3
+
+def tests(writer):
+  suite = Suite('sampling tests', writer)
+  suite.run_test('filter in the index', test_filter_in_index)
+  suite.run_test('flags', test_flags)
+  suite.run_test('warn about sampled out keyframes', test_missing_keyframe_warning)
+  return suite
+
+######### tests #################
+def test_filter_in_index(writer):
+  # Policies list the steps they keep without modifying the events the
+  # multiplexer shares with other plugins.
+  logdir = writer.get_logdir()
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': 0})
+  index = TensorIndex(multiplexer, SamplingPolicy('last', kept))
+  faces = torch.randint(0, 10, (1, 12, 3))
+  for i in range(steps):
+    writer.add_geometry('test_trim', torch.full((1, 10, 3), float(i)), faces=faces, global_step=i, keyframe_interval=4)
+  writer.flush()
+  multiplexer.AddRunsFromDirectory(logdir)
+  multiplexer.Reload()
+
+  run = list(multiplexer.Runs())[0]
+  for content_type in [GeoPluginData.VERTICES, GeoPluginData.FACES]:
+    instance_tag = metadata.get_instance_name('test_trim', content_type)
+    loaded = multiplexer.Tensors(run, instance_tag)
+    serialized = [event.tensor_proto.SerializeToString() for event in loaded]
+
+    events = index.tensors(run, instance_tag)
+    assert [event.step for event in events] == list(range(steps - kept, steps))
+    assert index.step_counts(run, instance_tag) == (kept, steps)
+    for event in events:
+      data = np.frombuffer(event.tensor_proto.tensor_content, dtype=np.int32 if content_type == GeoPluginData.FACES else np.float32)
+      expected = faces.numpy() if content_type == GeoPluginData.FACES else np.full((1, 10, 3), event.step)
+      assert (data == expected.reshape(-1)).all()
+    assert [event.tensor_proto.SerializeToString() for event in multiplexer.Tensors(run, instance_tag)] == serialized
+
+def test_flags(writer):
+  # samples_per_plugin is only changed by the plugin's own flags.
+  def fixed(samples_per_plugin, **kwargs):
+    flags = argparse.Namespace(
+      geometry_cache_mb=None, geometry_decode_threads=None, geometry_samples=None,
+      geometry_sampling='reservoir', geometry_sampling_stride=DEFAULT_STRIDE,
+      geometry_loaded_steps=DEFAULT_LOADED_STEPS, samples_per_plugin=samples_per_plugin
+    )
+    vars(flags).update(kwargs)
+    GeoPluginLoader().fix_flags(flags)
+    return flags
+
+  assert fixed({}).samples_per_plugin == {}
+  assert fixed({'geometries': 5}).samples_per_plugin == {'geometries': 5}
+  assert fixed({}, geometry_samples=5).samples_per_plugin == {'geometries': 5}
+  flags = fixed({'geometries': 5}, geometry_sampling='last')
+  assert flags.samples_per_plugin == {'geometries': DEFAULT_LOADED_STEPS}
+  assert flags.geometry_samples == 5
+  try:
+    fixed({}, geometry_sampling='last', geometry_loaded_steps=5)
+    assert False, 'fewer loaded than listed steps'
+  except base_plugin.FlagsError:
+    pass
+
+def test_missing_keyframe_warning(writer):
+  # TensorBoard's reservoir may drop the keyframe of kept references, which
+  # must not go unnoticed.
+  logdir = writer.get_logdir()
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': kept})
+  index = TensorIndex(multiplexer)
+  faces = torch.randint(0, 10, (1, 12, 3))
+  for i in range(steps):
+    writer.add_geometry('test_keyframes', torch.rand(1, 10, 3), faces=faces, global_step=i, keyframe_interval=steps)
+  writer.flush()
+  multiplexer.AddRunsFromDirectory(logdir)
+  multiplexer.Reload()
+
+  warnings = []
+  handler = logging.Handler()
+  handler.emit = warnings.append
+  tb_logging.get_logger().addHandler(handler)
+  try:
+    run = list(multiplexer.Runs())[0]
+    vertices = index.tensors(run, metadata.get_instance_name('test_keyframes', GeoPluginData.VERTICES))
+    kept_faces = index.tensors(run, metadata.get_instance_name('test_keyframes', GeoPluginData.FACES))
+    index.tensors(run, metadata.get_instance_name('test_keyframes', GeoPluginData.FACES))
+  finally:
+    tb_logging.get_logger().removeHandler(handler)
+
+  assert len(vertices) == kept
+  missing = set(event.step for event in vertices) - set(event.step for event in kept_faces)
+  assert missing and 0 not in missing, 'faces of steps %s' % sorted(missing)
+  assert len(warnings) == 1 and warnings[0].levelno == logging.WARNING, warnings
@@ -0,0 +1,296 @@
+import json
+import os
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+import werkzeug
+from tensorboard.backend.event_processing import plugin_event_multiplexer
+from tensorboard.plugins import base_plugin
+from werkzeug.test import Client
+
+from tensorboard_plugin_geometry import metadata
+from tensorboard_plugin_geometry import plugin as plugin_module
+from tensorboard_plugin_geometry.plugin import GeoPlugin
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+from tensorboard_plugin_geometry.static_files import StaticFiles
+from tensorboard_plugin_geometry.step_notifier import StepNotifier
+from tensorboard_plugin_geometry.tag_server import TagServer
+
+from .utils import Suite
+
+def tests(writer):
+  suite = Suite('server tests', writer)
+  suite.run_test('notify new tag of a known run', test_notify_new_tag)
+  suite.run_test('stats of listed steps', test_stats)
+  suite.run_test('missing static files', test_missing_static_files)
+  suite.run_test('unknown runs and tags', test_not_found)
+  suite.run_test('malformed arguments', test_bad_request)
+  suite.run_test('bounds of quantized data', test_quantized_bounds)
+  suite.run_test('etags of compressed data', test_etags)
+  suite.run_test('step framing', test_step_framing)
+  suite.run_test('sample slicing', test_sample_slicing)
+  suite.run_test('since tokens', test_since_tokens)
+  suite.run_test('cache coalescing', test_cache_coalescing)
+  return suite
+
+######### tests #################
+def test_notify_new_tag(writer):
+  # A tag written to a run that is already known must be notified like new
+  # steps of known tags.
+  multiplexer = _multiplexer(writer)
+  notifier = StepNotifier(TagServer(multiplexer, metadata.PLUGIN_NAME))
+  writer.add_geometry('test_known_tag', torch.rand(1, 10, 3), global_step=0)
+  writer.flush()
+  multiplexer.Reload()
+  notifier.check()
+
+  writer.add_geometry('test_new_tag', torch.rand(1, 10, 3), global_step=0)
+  writer.flush()
+  multiplexer.Reload()
+  notifier.check()
+  notifications = [notification for _, notification in notifier.wait(0, 0)]
+  assert [(n['tag'], n['step']) for n in notifications] == [('test_new_tag', 0)], notifications
+
+def test_stats(writer):
+  # Clients need the stats of each step when they first list the steps,
+  # before any data was loaded.
+  vertices = torch.rand(2, 10, 3)
+  for i in range(3):
+    writer.add_geometry('test_stats', vertices + i, global_step=i)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  def stats(entries):
+    return {entry['step']: entry.get('stats') for entry in entries if entry['content_type'] == GeoPluginData.VERTICES}
+
+  listed = stats(_json(client.get('/geometries?run=.&tag=test_stats&stats=1')))
+  assert sorted(listed) == [0, 1, 2]
+  for step, step_stats in listed.items():
+    assert np.allclose([sample['min'] for sample in step_stats], (vertices + step).min(1)[0].numpy())
+    assert np.allclose([sample['max'] for sample in step_stats], (vertices + step).max(1)[0].numpy())
+
+  # A token of a listing without stats must not hide them.
+  token = _json(client.get('/geometries?run=.&tag=test_stats&since='))['token']
+  changes = _json(client.get('/geometries?run=.&tag=test_stats&stats=1&since=' + token))
+  assert stats(changes['changed']) == listed
+
+def test_missing_static_files(writer):
+  # Clients may request any path, only files of the bundle are kept.
+  with tempfile.TemporaryDirectory() as directory:
+    with open(os.path.join(directory, 'index.js'), 'wb') as f:
+      f.write(b'export {};')
+    static_files = StaticFiles(directory)
+    assert static_files.get('index.js').content == b'export {};'
+    for i in range(100):
+      assert static_files.get('missing%d.js' % i) is None
+    assert len(static_files._files) == 1
+
+  client = _client(_plugin(writer))
+  response = client.get('/assets/missing.woff2')
+  assert response.status_code == 404, response.status_code
+
+def test_not_found(writer):
+  writer.add_geometry('test_not_found', torch.rand(1, 10, 3), global_step=0)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  for route in ['/step?step=0&', '/data?step=0&content_type=VERTICES&', '/geometries?', '/geometries?since=&']:
+    assert client.get(route + 'run=.&tag=test_not_found').status_code == 200, route
+    for args in ['run=unknown&tag=test_not_found', 'run=.&tag=unknown']:
+      response = client.get(route + args)
+      assert response.status_code == 404, (route + args, response.status_code)
+
+def test_bad_request(writer):
+  writer.add_geometry('test_bad_request', torch.rand(1, 10, 3), global_step=0)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  for url in [
+    '/data?run=.&tag=test_bad_request&step=0&content_type=UNKNOWN',
+    '/data?run=.&tag=test_bad_request&step=x&content_type=VERTICES',
+    '/step?run=.&tag=test_bad_request&step=0&sample=x',
+    '/step?run=.&tag=test_bad_request&step=0&max_points=-1',
+    '/step?run=.&tag=test_bad_request&step=0&precision=int8',
+  ]:
+    response = client.get(url)
+    assert response.status_code == 400, (url, response.status_code)
+
+def test_quantized_bounds(writer):
+  # Only the requested step is decoded for the bounds of quantized data.
+  vertices = torch.rand(2, 10, 3)
+  for i in range(5):
+    writer.add_geometry('test_quantized_bounds', vertices * (i + 1), global_step=i)
+  writer.flush()
+  plugin = _plugin(writer)
+  client = _client(plugin)
+
+  entries = _json(client.get('/geometries?run=.&tag=test_quantized_bounds'))
+  assert entries and all('bounds' not in entry for entry in entries)
+  response = client.get('/data?run=.&tag=test_quantized_bounds&step=2&content_type=VERTICES&precision=uint16')
+  assert response.status_code == 200
+  assert len(plugin._data_server._stats) == 1
+
+  lower, upper = json.loads(response.headers['X-Geometry-Bounds'])
+  expected = (vertices * 3).reshape(-1, 3).numpy()
+  assert np.allclose(lower, expected.min(0)) and np.allclose(upper, expected.max(0))
+  quantized = np.frombuffer(response.get_data(), dtype=np.uint16).reshape(-1, 3)
+  decoded = np.array(lower) + quantized / 65535 * (np.array(upper) - np.array(lower))
+  assert np.allclose(decoded, expected, atol=1e-4)
+
+  response = client.get('/data?run=.&tag=test_quantized_bounds&step=2&content_type=VERTICES')
+  assert 'X-Geometry-Bounds' not in response.headers
+
+def test_etags(writer):
+  # The tag of a representation names its encoding only if it was applied.
+  writer.add_geometry('test_etags_small', torch.rand(1, 10, 3), global_step=0)
+  writer.add_geometry('test_etags_large', torch.rand(1, 1000, 3), global_step=0)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  for tag, compressed in [('test_etags_small', False), ('test_etags_large', True)]:
+    url = '/data?run=.&tag=%s&step=0&content_type=VERTICES' % tag
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert (response.headers.get('Content-Encoding') == 'gzip') == compressed, tag
+    assert etag.endswith('-gzip"') == compressed, etag
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304 and response.headers['ETag'] == etag, tag
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == (200 if compressed else 304), tag
+
+def test_step_framing(writer):
+  # Buffered and streamed payloads frame the same aligned components.
+  components = {
+    'vertices': torch.rand(2, 10, 3),
+    'vert_colors': torch.randint(0, 255, (2, 10, 3), dtype=torch.uint8),
+    'faces': torch.randint(0, 10, (2, 12, 3)),
+    'features': torch.rand(2, 10, 3),
+  }
+  writer.add_geometry('test_step_framing', global_step=0, **components)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  url = '/step?run=.&tag=test_step_framing&step=0'
+  min_stream_size = plugin_module._MIN_STREAM_SIZE
+  plugin_module._MIN_STREAM_SIZE = 0
+  try:
+    streamed = client.get(url)
+  finally:
+    plugin_module._MIN_STREAM_SIZE = min_stream_size
+  buffered = client.get(url)
+  assert buffered.status_code == 200 and streamed.status_code == 200
+  assert 'Content-Length' not in streamed.headers
+  assert streamed.get_data() == buffered.get_data()
+
+  arrays = _parse_step(buffered.get_data())
+  assert sorted(arrays) == sorted(components)
+  for name, tensor in components.items():
+    assert (arrays[name] == tensor.numpy()).all(), name
+
+def test_sample_slicing(writer):
+  vertices = torch.rand(4, 10, 3)
+  faces = torch.randint(0, 10, (4, 12, 3))
+  writer.add_geometry('test_sample_slicing', vertices, faces=faces, global_step=0)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  for sample, (start, stop) in [('1', (1, 2)), ('1:3', (1, 3)), ('2:', (2, 4)), (':1', (0, 1))]:
+    arrays = _parse_step(client.get('/step?run=.&tag=test_sample_slicing&step=0&sample=' + sample).get_data())
+    assert (arrays['vertices'] == vertices[start:stop].numpy()).all(), sample
+    assert (arrays['faces'] == faces[start:stop].numpy()).all(), sample
+
+    response = client.get('/data?run=.&tag=test_sample_slicing&step=0&content_type=VERTICES&sample=' + sample)
+    data = np.frombuffer(response.get_data(), dtype=np.float32)
+    assert (data == vertices[start:stop].numpy().reshape(-1)).all(), sample
+
+def test_since_tokens(writer):
+  # Clients polling with a token get only what changed, or 304.
+  writer.add_geometry('test_since_tokens', torch.rand(1, 10, 3), global_step=0)
+  writer.flush()
+  plugin = _plugin(writer)
+  client = _client(plugin)
+
+  tags = _json(client.get('/tags?since='))
+  assert tags['reset'] and 'test_since_tokens' in tags['changed']['.']
+  assert client.get('/tags?since=' + tags['token']).status_code == 304
+  steps = _json(client.get('/geometries?run=.&tag=test_since_tokens&since='))
+  assert steps['reset'] and [entry['step'] for entry in steps['changed']] == [0]
+  assert client.get('/geometries?run=.&tag=test_since_tokens&since=' + steps['token']).status_code == 304
+
+  writer.add_geometry('test_since_tokens', torch.rand(1, 10, 3), global_step=1)
+  writer.add_geometry('test_since_tokens_new', torch.rand(1, 10, 3), global_step=0)
+  writer.flush()
+  plugin._multiplexer.Reload()
+
+  changes = _json(client.get('/tags?since=' + tags['token']))
+  assert not changes['reset'] and 'test_since_tokens_new' in changes['changed']['.']
+  changes = _json(client.get('/geometries?run=.&tag=test_since_tokens&since=' + steps['token']))
+  assert not changes['reset'] and not changes['removed']
+  assert [entry['step'] for entry in changes['changed']] == [1]
+
+  changes = _json(client.get('/geometries?run=.&tag=test_since_tokens&since=unknown.1'))
+  assert changes['reset'] and [entry['step'] for entry in changes['changed']] == [0, 1]
+
+def test_cache_coalescing(writer):
+  # Concurrent requests for the same step decode it once.
+  writer.add_geometry('test_cache_coalescing', torch.rand(2, 1000, 3), global_step=0)
+  writer.flush()
+  client = _client(_plugin(writer))
+
+  clients = 8
+  with ThreadPoolExecutor(clients) as executor:
+    responses = list(executor.map(
+      lambda _: client.get('/step?run=.&tag=test_cache_coalescing&step=0').get_data(), range(clients)
+    ))
+  assert all(response == responses[0] for response in responses)
+
+  stats = _json(client.get('/cache'))
+  assert stats['misses'] == 1, stats
+  assert stats['hits'] + stats['coalesced'] == clients - 1, stats
+
+def _parse_step(payload):
+  """Splits a framed step payload into arrays of its components and checks
+  their alignment."""
+  header_length, = struct.unpack('<I', payload[:4])
+  header = json.loads(payload[4:4 + header_length].decode('utf8'))
+  data = payload[4 + header_length:]
+  assert (4 + header_length) % 8 == 0
+
+  arrays = {}
+  for component in header['components']:
+    assert component['offset'] % 8 == 0, component
+    array = np.frombuffer(data, dtype=component['dtype'], count=component['length'] // np.dtype(component['dtype']).itemsize, offset=component['offset'])
+    arrays[component['name']] = array.reshape(component['shape'])
+  return arrays
+
+def _multiplexer(writer):
+  """Creates a multiplexer loading all steps of the writer's log directory."""
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': 0})
+  multiplexer.AddRunsFromDirectory(writer.get_logdir())
+  return multiplexer
+
+def _plugin(writer):
+  """Creates the plugin for the writer's log directory."""
+  multiplexer = _multiplexer(writer)
+  multiplexer.Reload()
+  return GeoPlugin(base_plugin.TBContext(logdir=writer.get_logdir(), multiplexer=multiplexer))
+
+def _client(plugin):
+  """Creates a client of the plugin's routes."""
+  apps = plugin.get_plugin_apps()
+  def app(environ, start_response):
+    route = apps.get(environ['PATH_INFO'])
+    if route is None:
+      return werkzeug.Response(status=404)(environ, start_response)
+    return route(environ, start_response)
+  return Client(app, werkzeug.Response)
+
+def _json(response):
+  """Parses the JSON body of a successful response."""
+  assert response.status_code == 200, response.status_code
+  return json.loads(response.get_data())
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import torch
+from tensorboard.backend.event_processing import plugin_event_multiplexer
+from torch.utils.tensorboard import SummaryWriter
+
+from tensorboard_plugin_geometry import metadata
+from tensorboard_plugin_geometry.plugin_data_pb2 import GeoPluginData
+from tensorboard_plugin_geometry.summary import add_geometry, use_sidecar_storage
+from tensorboard_plugin_geometry.tensor_index import TensorIndex
+
+from .utils import Suite
+
+steps = 300
+
+def tests(writer):
+  suite = Suite('sidecar tests', writer)
+  suite.run_test('growing sidecar file', test_growing_sidecar)
+  suite.run_test('closed and reopened writer', test_reopened_writer)
+  return suite
+
+######### tests #################
+def test_growing_sidecar(writer):
+  # The sidecar file grows with each step while TensorBoard reloads the run,
+  # which must neither keep a mapping per size of the file nor drop steps.
+  use_sidecar_storage(writer, min_size=0)
+  logdir = writer.get_logdir()
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': 0})
+  multiplexer.AddRunsFromDirectory(logdir)
+  index = TensorIndex(multiplexer)
+  instance_tag = metadata.get_instance_name('test_growing_sidecar', GeoPluginData.VERTICES)
+
+  open_files = _open_files()
+  for i in range(steps):
+    writer.add_geometry('test_growing_sidecar', torch.full((1, 100, 3), float(i)), global_step=i)
+    writer.flush()
+    multiplexer.Reload()
+    run = list(multiplexer.Runs())[0]
+    events = index.tensors(run, instance_tag)
+    assert len(events) == i + 1, 'step %d of %d listed' % (len(events), i + 1)
+
+  for event in events:
+    data = np.frombuffer(event.tensor_proto.tensor_content, dtype=np.float32)
+    assert (data == event.step).all()
+
+  if open_files is not None:
+    assert _open_files() - open_files < 10, 'sidecar file opened %d times' % (_open_files() - open_files)
+
+def test_reopened_writer(writer):
+  # Closing the writer closes the sidecar file, a writer that is used again
+  # keeps storing components in it.
+  logdir = os.path.join(writer.get_logdir(), 'reopened')
+  reopened = SummaryWriter(log_dir=logdir)
+  use_sidecar_storage(reopened, min_size=0)
+  for i in range(2):
+    add_geometry(reopened, 'test_reopened_writer', torch.full((1, 100, 3), float(i)), global_step=i)
+    reopened.close()
+    assert not [name for name in _open_file_names() if name.startswith(os.path.abspath(logdir))]
+
+  sidecar_files = [name for name in os.listdir(logdir) if name.endswith('.bin')]
+  assert len(sidecar_files) == 1, sidecar_files
+  assert os.path.getsize(os.path.join(logdir, sidecar_files[0])) >= 2 * 100 * 3 * 4
+  multiplexer = plugin_event_multiplexer.EventMultiplexer(tensor_size_guidance={'geometries': 0})
+  multiplexer.AddRun(logdir)
+  multiplexer.Reload()
+  instance_tag = metadata.get_instance_name('test_reopened_writer', GeoPluginData.VERTICES)
+  events = TensorIndex(multiplexer).tensors(logdir, instance_tag)
+  assert [event.step for event in events] == [0, 1]
+  for event in events:
+    data = np.frombuffer(event.tensor_proto.tensor_content, dtype=np.float32)
+    assert (data == event.step).all()
+
+def _open_file_names():
+  """Names of the files the process has open, empty if unknown."""
+  if not os.path.isdir('/proc/self/fd'):
+    return []
+  names = []
+  for fd in os.listdir('/proc/self/fd'):
+    try:
+      names.append(os.readlink(os.path.join('/proc/self/fd', fd)))
+    except OSError:
+      pass
+  return names
+
+def _open_files():
+  """Number of open file descriptors of the process, None if unknown."""
+  if not os.path.isdir('/proc/self/fd'):
+    return None
+  return len(os.listdir('/proc/self/fd'))
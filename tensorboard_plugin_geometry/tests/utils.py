@@ -1,4 +1,5 @@
 import sys
+import time
 import torch
 
 def get_rand_vecs(vertices):
@@ -28,3 +29,29 @@ class Suite:
       print('❌')
       raise err
 
+
+class Benchmark:
+
+  divider = Suite.divider
+
+  def __init__(self, title, repeat=5):
+    print(self.divider % ' %s ' % title)
+    self.repeat = repeat
+    self.results = {}
+
+  def run_benchmark(self, title, callback, *args, setup=None):
+    """Runs callback `repeat` times and reports the median wall time in ms.
+    If given, setup is called before each run without being timed."""
+    timings = []
+    for _ in range(self.repeat):
+      if setup is not None:
+        setup()
+      start = time.perf_counter()
+      callback(*args)
+      timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    self.results[title] = median
+    print('%-50s %10.3f ms' % (title, median), flush=True)
+    return median